@@ -0,0 +1,153 @@
+"""
+Benchmarks Birdcall's operations against an offline, synthetic stand-in for the Twitter API, reporting the
+wall time, API calls, simulated rate limit waits, and peak memory of each one. Also benchmarks how long it
+takes to import Birdcall, which dominates the cold starts of serverless invocations.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from birdcall import birdcall
+from birdcall.fake import FakeTwitter
+
+OPERATIONS = {
+    "download_followers": lambda o, args: o.download_followers("user2", os.path.join(args.workdir, "followers.csv")),
+    "unfollow_traitors": lambda o, args: o.unfollow_traitors(),
+    "retweet_replies": lambda o, args: o.retweet_replies(tweet_id=1, like=True, follow=True, delay=0),
+    "retweet_search": lambda o, args: o.retweet_search("#gamedev", followers=True, filter_count=0, like=True)
+}
+
+IMPORT_SCRIPT = "import time; start = time.perf_counter(); import birdcall; print(time.perf_counter() - start)"
+
+
+def benchmark_import(args):
+    """
+    Measures how long a fresh interpreter takes to import Birdcall, taking the best of several runs to filter
+    out noise.
+    """
+
+    wall_times = [
+        float(subprocess.run(
+            [sys.executable, "-c", IMPORT_SCRIPT],
+            capture_output=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            text=True
+        ).stdout)
+        for _ in range(5)
+    ]
+
+    return {
+        "operation": "import",
+        "wall_time": min(wall_times),
+        "api_calls": 0,
+        "api_calls_by_endpoint": {},
+        "rate_limited_time": 0,
+        "peak_memory": None,
+        "metrics": None
+    }
+
+
+def benchmark(operation, args):
+    """
+    Runs an operation against a fresh fake and returns its measurements.
+    """
+
+    o = birdcall.Birdcall()
+    o.attach(FakeTwitter.api(followers=args.followers, friends=args.friends, tweets=args.tweets))
+    o.cache_dir = args.workdir
+
+    if args.memory:
+        tracemalloc.start()
+
+    start = time.perf_counter()
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        OPERATIONS[operation](o, args)
+
+    wall_time = time.perf_counter() - start
+    peak_memory = None
+
+    if args.memory:
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {
+        "operation": operation,
+        "wall_time": wall_time,
+        "api_calls": sum(o.api.session.calls.values()),
+        "api_calls_by_endpoint": dict(o.api.session.calls),
+        "rate_limited_time": o.api.session.rate_limited_time,
+        "peak_memory": peak_memory,
+        "metrics": json.loads(o.metrics.to_json())
+    }
+
+
+if __name__ == "__main__":
+    #
+    # Parse arguments.
+    #
+    arg_parser = argparse.ArgumentParser()
+
+    arg_parser.add_argument("operations", nargs="*", default=["import", *OPERATIONS],
+                            help="operations to benchmark (or \"import\" to benchmark import time)")
+    arg_parser.add_argument("--followers", type=int, default=100000, help="number of synthetic followers")
+    arg_parser.add_argument("--friends", type=int, default=20000, help="number of synthetic friends")
+    arg_parser.add_argument("--tweets", type=int, default=10000, help="number of synthetic tweets to search")
+    arg_parser.add_argument("--no-memory", dest="memory", action="store_false",
+                            help="skip peak memory tracing (which slows operations down)")
+    arg_parser.add_argument("--json", action="store_true", help="output results in JSON format")
+    arg_parser.add_argument("--max-import-time", type=float,
+                            help="fail if importing Birdcall takes longer than this many seconds")
+
+    args = arg_parser.parse_args()
+
+    #
+    # Run the benchmarks in a scratch directory so that no caches or outputs carry over between them.
+    #
+    results = []
+
+    for operation in args.operations:
+        if operation == "import":
+            results.append(benchmark_import(args))
+
+            continue
+
+        with tempfile.TemporaryDirectory() as workdir:
+            args.workdir = workdir
+
+            results.append(benchmark(operation, args))
+
+    #
+    # Output the results.
+    #
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            peak_memory = "n/a" if result["peak_memory"] is None else f"{result['peak_memory'] / 2 ** 20:.1f} MiB"
+
+            print(
+                f"{result['operation']:<20} "
+                f"{result['wall_time']:>8.2f}s "
+                f"{result['api_calls']:>8} calls "
+                f"{result['rate_limited_time'] / 60:>8.0f}m rate limited "
+                f"{peak_memory:>12} peak"
+            )
+
+    #
+    # Fail if startup has regressed past the specified limit.
+    #
+    import_result = next((result for result in results if result["operation"] == "import"), None)
+
+    if args.max_import_time is not None and import_result and import_result["wall_time"] > args.max_import_time:
+        print(f"Importing Birdcall took {import_result['wall_time']:.3f}s (limit: {args.max_import_time:.3f}s).")
+
+        sys.exit(1)
@@ -0,0 +1,82 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    A thread-safe token-bucket rate limiter. Tokens refill continuously at the specified rate (per second) up
+    to the specified capacity, and each acquisition consumes one token, blocking until one is available.
+    """
+
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate
+        self.capacity = capacity
+
+        self._tokens = float(capacity)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Blocks until a token is available and then consumes it. A bucket with a non-positive rate never
+        limits.
+        """
+
+        if self.rate <= 0:
+            return
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+
+                    return
+
+                wait = (1 - self._tokens) / self.rate
+
+            time.sleep(wait)
+
+
+class ActionExecutor:
+    """
+    Runs write actions (e.g. retweets, likes, and follows) on a pool of worker threads so that the caller can
+    keep searching and filtering while they are pending. Actions submitted as limited are spaced out by the
+    executor's token bucket before they run.
+    """
+
+    def __init__(self, limiter: TokenBucket = None, workers: int = 4):
+        self.limiter = limiter
+
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+
+    def submit(self, action, *args, limited=False, **kwargs):
+        """
+        Queues an action to be run with the specified arguments and returns a future for its result.
+        """
+
+        def run():
+            if limited and self.limiter:
+                self.limiter.acquire()
+
+            return action(*args, **kwargs)
+
+        return self._pool.submit(run)
+
+    def shutdown(self):
+        """
+        Waits for all queued actions to complete and then releases the executor's worker threads.
+        """
+
+        self._pool.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.shutdown()
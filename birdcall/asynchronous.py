@@ -0,0 +1,98 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import functools
+
+from .birdcall import Birdcall
+from .daemon import wait_time
+
+
+class AsyncBirdcall:
+    """
+    An asyncio interface to Birdcall's operations, so that many of them can be run (and kept in flight) from a
+    single event loop.
+
+    Operations run on a pool of worker threads over a shared Birdcall instance, so they share its client, warm
+    caches, and rate limit budget. The parts of operations that share state (e.g. selecting a file from the
+    same queue to tweet) are serialized by the instance. An operation waits (without blocking the event loop)
+    while the budget of any endpoint that it primarily depends on is exhausted, rather than occupying a worker
+    while it sleeps.
+    """
+
+    def __init__(self, birdcall: Birdcall = None, workers: int = 8):
+        self.birdcall = birdcall or Birdcall()
+
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    def auth(self, *args, **kwargs):
+        """
+        Authenticates the underlying Birdcall instance. See "Birdcall.auth()".
+        """
+
+        self.birdcall.auth(*args, **kwargs)
+
+    async def direct_message_followers(self, *args, **kwargs):
+        """
+        See "Birdcall.direct_message_followers()".
+        """
+
+        return await self._run("direct_message_followers", *args, **kwargs)
+
+    async def download_followers(self, *args, **kwargs):
+        """
+        See "Birdcall.download_followers()".
+        """
+
+        return await self._run("download_followers", *args, **kwargs)
+
+    async def retweet_replies(self, *args, **kwargs):
+        """
+        See "Birdcall.retweet_replies()".
+        """
+
+        return await self._run("retweet_replies", *args, **kwargs)
+
+    async def retweet_search(self, *args, **kwargs):
+        """
+        See "Birdcall.retweet_search()".
+        """
+
+        return await self._run("retweet_search", *args, **kwargs)
+
+    async def tweet(self, *args, **kwargs):
+        """
+        See "Birdcall.tweet()".
+        """
+
+        return await self._run("tweet", *args, **kwargs)
+
+    async def unfollow_traitors(self, *args, **kwargs):
+        """
+        See "Birdcall.unfollow_traitors()".
+        """
+
+        return await self._run("unfollow_traitors", *args, **kwargs)
+
+    async def close(self):
+        """
+        Waits for running operations to complete and shuts down the worker threads.
+        """
+
+        await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+
+    async def _run(self, operation, *args, **kwargs):
+        #
+        # Wait for the operation's endpoints to have budget.
+        #
+        while (wait := wait_time(self.birdcall.budget, operation)) > 0:
+            await asyncio.sleep(wait)
+
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor,
+            functools.partial(getattr(self.birdcall, operation), *args, **kwargs)
+        )
@@ -1,28 +1,122 @@
-import array
+from __future__ import annotations
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import ExitStack
 import csv
 from datetime import date
+from functools import lru_cache
+import hashlib
+from itertools import islice
+import json
 import os.path
 import random
+import threading
 import time
+from typing import TYPE_CHECKING
+
+from .actions import ActionExecutor, TokenBucket
+from .budget import RateBudget
+from .content import ContentQueue, validate_media, validate_text
+from .lazy import lazy_import
+from .ledger import FAILED, LIKED, RETWEETED, Ledger
+from .media import MediaUploader
+from .metrics import Metrics, instrumented
+from .query import shard_query
+from .store import FOLLOWER_FIELDS, FollowerStore
+
+if TYPE_CHECKING:
+    from .transport import Transport
+
+#
+# Heavy dependencies are only imported once they are actually used, to keep cold starts fast.
+#
+dotenv = lazy_import("dotenv")
+tweepy = lazy_import("tweepy")
+
+#
+# Authenticated clients (and their rate limit budgets), memoized by credentials so that authenticating again in
+# a warm process (e.g. a reused serverless runtime) does not rebuild them.
+#
+_clients = {}
+
+#
+# The code of the error that the API responds with when media attached to a tweet could not be processed.
+#
+MEDIA_ERROR = 324
+
 
-from dotenv import load_dotenv
-import tweepy
+@lru_cache(maxsize=None)
+def _load_environment():
+    """
+    Loads environment variables from the ".env" file, only once per process.
+    """
+
+    dotenv.load_dotenv()
 
 
 class Birdcall:
     api: tweepy.API = None
-
-    def auth(self, consumer_key=None, consumer_secret=None, access_token=None, access_secret=None):
+    budget: RateBudget = None
+    transport: Transport = None
+    metrics: Metrics = None
+    profiler = None
+    cache_dir: str = None
+    mute_cache_ttl: int = 15 * 60
+    audience_cache_ttl: int = 60 * 60
+    friend_cache_ttl: int = 24 * 60 * 60
+    status_cache_ttl: int = 60
+
+    _muted_ids: set = None
+    _muted_ids_fetched_at: float = 0
+    _friend_ids: set = None
+    _friend_ids_fetched_at: float = 0
+    _audiences: dict = None
+    _ledger: Ledger = None
+    _statuses: dict = None
+    _since_ids: dict = None
+    _queues: dict = None
+    _media_uploader: MediaUploader = None
+
+    def __init__(self):
+        self.metrics = Metrics()
+
+        self._friends_lock = threading.Lock()
+        self._friends_load_lock = threading.Lock()
+
+        # NOTE: Operations may run concurrently on threads (e.g. via "AsyncBirdcall"). One lock guards the lazy
+        #  initialization of caches that are cheap to load (and the queues of content), while caches that are
+        #  fetched from the API each have their own, so that a slow fetch only blocks the operations that need it.
+        self._cache_lock = threading.RLock()
+        self._mutes_lock = threading.Lock()
+        self._audience_locks = {}
+
+    def auth(
+            self,
+            consumer_key=None,
+            consumer_secret=None,
+            access_token=None,
+            access_secret=None,
+            wait_on_rate_limit=True,
+            transport: Transport = None
+    ):
         """
         Authenticates with the Twitter API using the consumer key, consumer secret, access token, and
         access secret set in the runtime environment. Returns an authenticated API client that can be used
         to make calls.
+
+        The remaining rate limit budget of each endpoint is tracked in the "budget" attribute. The client sleeps
+        whenever an endpoint that it calls is exhausted, unless "wait_on_rate_limit" is disabled (in which case
+        calls to exhausted endpoints raise "tweepy.TooManyRequests" instead).
+
+        Requests are sent over a pooled, keep-alive HTTP transport that retries transient errors, which can be
+        configured by specifying one (and whose connection reuse statistics are available via
+        "transport.stats()").
         """
 
         #
         # Load environment variables.
         #
-        load_dotenv()
+        _load_environment()
 
         twitter_consumer_key = os.getenv('TWITTER_CONSUMER_KEY', consumer_key)
         twitter_consumer_secret = os.getenv('TWITTER_CONSUMER_SECRET', consumer_secret)
@@ -30,81 +124,301 @@ class Birdcall:
         twitter_access_secret = os.getenv('TWITTER_ACCESS_SECRET', access_secret)
 
         #
-        # Authenticate w/Twitter and store the authenticated client.
+        # Authenticate w/Twitter and store the authenticated client, reusing a memoized one if we have already
+        # authenticated with the same credentials.
+        #
+        key = (
+            twitter_consumer_key,
+            twitter_consumer_secret,
+            twitter_access_token,
+            twitter_access_secret,
+            wait_on_rate_limit
+        )
+
+        if key not in _clients:
+            auth = tweepy.OAuthHandler(twitter_consumer_key, twitter_consumer_secret)
+            auth.set_access_token(twitter_access_token, twitter_access_secret)
+
+            _clients[key] = (tweepy.API(auth, wait_on_rate_limit=wait_on_rate_limit), RateBudget(), None)
+
+        api, budget, installed = _clients[key]
+
+        #
+        # Install the specified (or a default) transport on the client, unless it is already installed.
         #
-        auth = tweepy.OAuthHandler(twitter_consumer_key, twitter_consumer_secret)
-        auth.set_access_token(twitter_access_token, twitter_access_secret)
+        # NOTE: The transport (and the HTTP stack beneath it) is only imported once it is needed.
+        from .transport import Transport
+
+        self.transport = transport or installed or Transport()
 
-        self.api = tweepy.API(auth, wait_on_rate_limit=True)
+        if self.transport is not installed:
+            self.transport.mount(api.session)
 
-    def download_followers(self, user: str, output: str, append: bool = False):
+            _clients[key] = (api, budget, self.transport)
+
+        self.attach(api, budget)
+
+    def attach(self, api: tweepy.API, budget: RateBudget = None):
+        """
+        Stores an API client (e.g. one authenticated elsewhere, or a fake one) for subsequent calls to use, and
+        installs rate limit tracking and instrumentation on it. A rate limit budget that is already tracking
+        the client may be specified to keep using it.
+        """
+
+        self.api = api
+        self.budget = budget or RateBudget()
+
+        #
+        # Track the rate limit budget of each endpoint, and count and time requests to it, from every response.
+        #
+        # NOTE: Hooks installed by any instance that was previously attached to the same client are replaced.
+        #
+        hooks = self.api.session.hooks["response"]
+        hooks[:] = [hook for hook in hooks if not isinstance(getattr(hook, "__self__", None), (RateBudget, Metrics))]
+        hooks += [self.budget.hook, self.metrics.hook]
+
+    def save_snapshot(self, path: str):
+        """
+        Saves the instance's warm state (its cached mutes, friends, and audiences, and its rate limit budgets) to
+        a file, so that a fresh process can restore it rather than re-fetching it.
+        """
+
+        self._save_json(path, {
+            "muted_ids": list(self._muted_ids or []),
+            "muted_ids_fetched_at": self._muted_ids_fetched_at,
+            "friend_ids": list(self._friend_ids or []),
+            "friend_ids_fetched_at": self._friend_ids_fetched_at,
+            "audiences": {
+                name: [fetched_at, list(screen_names.items())]
+                for name, (fetched_at, screen_names) in (self._audiences or {}).items()
+            },
+            "budgets": self.budget.budgets() if self.budget else {}
+        })
+
+    def load_snapshot(self, path: str):
+        """
+        Restores warm state saved by "save_snapshot()", if the file exists. Cached state is still subject to
+        the usual time-to-lives.
+        """
+
+        if not os.path.exists(path):
+            return
+
+        with open(path, mode="r") as f:
+            state = json.load(f)
+
+        if state["muted_ids_fetched_at"]:
+            self._muted_ids = set(state["muted_ids"])
+            self._muted_ids_fetched_at = state["muted_ids_fetched_at"]
+
+        if state.get("friend_ids_fetched_at"):
+            self._friend_ids = set(state["friend_ids"])
+            self._friend_ids_fetched_at = state["friend_ids_fetched_at"]
+
+        self._audiences = {
+            name: (fetched_at, dict(screen_names))
+            for name, (fetched_at, screen_names) in state["audiences"].items()
+        }
+
+        if self.budget:
+            for endpoint, budget in state["budgets"].items():
+                self.budget.update(endpoint, budget["remaining"], budget["reset"], budget["limit"])
+
+    @instrumented
+    def download_followers(
+            self,
+            user: str,
+            output: str = None,
+            append: bool = False,
+            checkpoint: str = None,
+            store: str = None,
+            strategy: str = "ids",
+            workers: int = 4
+    ):
         """
         Given the handle of a Twitter user, download all of their followers into a CSV file for further
-        archiving and/or analysis.
+        archiving and/or analysis. If a checkpoint file is specified, each page of followers is flushed to
+        the CSV file as it is downloaded and the pagination cursor is saved so that an interrupted download
+        can be resumed from where it left off.
+
+        If a store directory is specified, followers are instead appended to a compact follower store (which
+        is always incremental, as if appending), and the CSV file (if specified) is exported from it.
+
+        By default ("ids"), the ids of followers are paged through (5,000 per call) and only followers that have
+        not already been downloaded are looked up (100 per call, with lookups run concurrently), so appending
+        only spends calls on new followers. Alternatively ("list"), full followers are paged through (200 per
+        call).
         """
 
+        if strategy not in ("ids", "list"):
+            raise ValueError(f"Unknown strategy \"{strategy}\". Must be one of ['ids', 'list'].")
+
+        if not output and not store:
+            raise ValueError("Either an output file or a store directory must be specified.")
+
+        destination = store or output
+
+        #
+        # If a checkpoint was left behind by an interrupted download of the same user's followers, resume from
+        # its cursor. A resumed download is always an append-only download since the output file already
+        # contains the pages downloaded before the interruption.
+        #
+        cursor = -1
+
+        if checkpoint and os.path.exists(checkpoint):
+            with open(checkpoint, mode="r") as f:
+                state = json.load(f)
+
+            if state["user"] == user and state["output"] == destination and state.get("strategy", "list") == strategy:
+                cursor = state["cursor"]
+                append = True
+
+                print(f"Resuming download of {user}'s followers from cursor {cursor}.")
+
         #
         # If we are doing an append-only download, load the currently-downloaded followers into memory.
         #
+        # NOTE: Alongside the rows themselves, we keep a set of the ids that have already been downloaded so
+        #  that checking whether a follower is new is a constant-time operation rather than a scan of every
+        #  loaded row. A follower store keeps such an index of its own, and its rows stay on disk.
+        #
         rows = []
+        row_ids = set()
+        followers = None
 
-        if append and os.path.exists(output):
+        if store:
+            followers = row_ids = FollowerStore(store)
+
+            print(f"Loaded {len(row_ids)} followers.")
+        elif append and os.path.exists(output):
             with open(output, mode="r") as f:
                 reader = csv.DictReader(f)
 
                 for row in reader:
                     rows.append(row)
+                    row_ids.add(int(row["id"]))
 
             print(f"Loaded {len(rows)} followers.")
 
+        #
+        # If we are checkpointing to a CSV file, start it fresh unless we are appending to it. Pages will be
+        # appended to it as they are downloaded.
+        #
+        if checkpoint and not store and not (append and os.path.exists(output)):
+            with open(output, mode="w") as f:
+                csv.DictWriter(f, fieldnames=FOLLOWER_FIELDS).writeheader()
+
         #
         # Download all the specified user's followers.
         #
         downloaded_count = 0
 
-        for user in tweepy.Cursor(
+        if strategy == "ids":
+            pages = tweepy.Cursor(self.api.get_follower_ids, count=5000, screen_name=user, cursor=cursor).pages()
+        else:
+            pages = tweepy.Cursor(
                 self.api.get_followers,
-                count=1000,
+                count=200,
                 include_user_entities=False,
-                screen_name=user
-        ).items():
-            #
-            # Add the follower to the list of downloaded followers if they are not already in it.
-            #
-            # NOTE: We must cast values from the CSV file and values from the Twitter API to the same
-            #  type so that the comparison can work.
-            #
-            if not next((row for row in rows if int(row["id"]) == int(user.id)), None):
-                downloaded_count += 1
-                row = {
-                    "id": user.id,
-                    "screen_name": user.screen_name,
-                    "name": user.name,
-                    "location": user.location,
-                    "bio": user.description,
-                    "website": user.url,
-                    "direct_message_link": (f"https://twitter.com/messages/compose?recipient_id=%d" % user.id),
-                    "direct_messaged": False
-                }
+                screen_name=user,
+                cursor=cursor
+            ).pages()
 
-                rows.append(row)
+        for page in pages:
+            page_rows = {}
+
+            #
+            # If we are paging through ids, look up the followers that have not already been downloaded.
+            #
+            # NOTE: Followers that could not be looked up (e.g. because they are suspended) are skipped, and
+            #  will be looked up again by the next download.
+            #
+            if strategy == "ids":
+                new_ids = [follower_id for follower_id in dict.fromkeys(page) if int(follower_id) not in row_ids]
+
+                with self.metrics.span("follower_lookup"):
+                    accounts = self._lookup_users(new_ids, workers)
+
+                page = [accounts[follower_id] for follower_id in new_ids if follower_id in accounts]
+
+            for follower in page:
+                #
+                # Add the follower to the list of downloaded followers if they are not already in it.
+                #
+                # NOTE: Ids from the CSV file are cast to integers as they are indexed, so we must do the same
+                #  to values from the Twitter API so that the lookup can work.
+                #
+                if int(follower.id) not in row_ids and int(follower.id) not in page_rows:
+                    downloaded_count += 1
+                    page_rows[int(follower.id)] = {
+                        "id": follower.id,
+                        "screen_name": follower.screen_name,
+                        "name": follower.name,
+                        "location": follower.location,
+                        "bio": follower.description,
+                        "website": follower.url,
+                        "direct_message_link": (
+                            f"https://twitter.com/messages/compose?recipient_id=%d" % follower.id
+                        ),
+                        "direct_messaged": False
+                    }
+
+            #
+            # Add the page to the downloaded followers. A follower store flushes it to disk as it goes, as does
+            # checkpointing (after which the cursor of the next page is saved).
+            #
+            # NOTE: The page is flushed before the cursor is saved. If we are interrupted in between the two,
+            #  the page will be downloaded again when resuming, but its followers will be skipped as
+            #  duplicates.
+            #
+            with self.metrics.span("page_flush"):
+                if store:
+                    followers.append(page_rows.values())
+                else:
+                    rows.extend(page_rows.values())
+                    row_ids.update(page_rows)
+
+                    if checkpoint:
+                        with open(output, mode="a") as f:
+                            csv.DictWriter(f, fieldnames=FOLLOWER_FIELDS).writerows(page_rows.values())
+
+                if checkpoint:
+                    self._save_json(checkpoint, {
+                        "user": user,
+                        "output": destination,
+                        "strategy": strategy,
+                        "cursor": pages.next_cursor
+                    })
+
+            self.metrics.count("followers_downloaded_total", len(page_rows))
 
         print(f"Downloaded {downloaded_count} followers.")
 
         #
-        # Output the results.
+        # Output the results. If we were using a follower store, compact it if necessary and export it. If we
+        # were checkpointing, the results are already on disk and the checkpoint is no longer needed.
         #
-        with open(output, mode="w") as f:
-            writer = csv.DictWriter(f, fieldnames=rows[0].keys())
+        if store:
+            followers.maybe_compact()
+
+            if output:
+                followers.export(output)
+        elif not checkpoint:
+            with open(output, mode="w") as f:
+                writer = csv.DictWriter(f, fieldnames=FOLLOWER_FIELDS)
 
-            writer.writeheader()
-            writer.writerows(rows)
+                writer.writeheader()
+                writer.writerows(rows)
+
+        if checkpoint and os.path.exists(checkpoint):
+            os.remove(checkpoint)
 
         #
         # Output some debug information.
         #
-        print(f"Saved {len(rows)} followers to {output}.")
+        print(f"Saved {len(row_ids)} followers to {destination}.")
 
+    @instrumented
     def retweet_replies(
             self,
             tweet_query=None,
@@ -114,23 +428,33 @@ class Birdcall:
             follow=False,
             max_retweets=7,
             delay=30,
-            traverse_quotes=False
+            traverse_quotes=False,
+            burst=1,
+            workers=4,
+            stream=None
     ):
         """
         Given the id of a tweet, retweets replies to it. Optionally allows for the root reply or a tweet
         that it links to be retweets. Also supports liking the replies and following their authors.
+        Retweets are spaced out to an average of one per delay interval, with up to a burst of them allowed
+        back-to-back.
+
+        If a stream source (e.g. a "TwitterStream") is specified, replies are processed as they are pushed by
+        the stream rather than searched for, until the stream ends or the maximum number of replies has been
+        retweeted.
         """
 
         #
         # Fetch a set of muted user ids. We will make sure to not retweet anything by these users (for some
         # reason, muted users' tweets occasionally slip through the search filter).
         #
-        muted_ids = []
+        muted_ids = self._load_muted_ids()
 
-        for mute_id in tweepy.Cursor(self.api.get_muted_ids).items():
-            muted_ids.append(mute_id)
-
-        print(f"Loaded {len(muted_ids)} mutes.")
+        #
+        # Load the ledger of tweets that we have already processed, so that we can skip them without spending
+        # API calls on them.
+        #
+        ledger = self._load_ledger()
 
         #
         # Query for replies to the specified tweet.
@@ -143,11 +467,15 @@ class Birdcall:
         # Build up a chronologically-ordered list of ids and authors of the tweets that we want to find replies to.
         tweet_ids = []
         tweet_authors = []
+        tweet_author_ids = []
+        tweet_ids_by_author = {}
 
         if tweet_id is not None:
             tweet = self.api.get_status(tweet_id, include_entities=False)
             tweet_ids.append(tweet.id)
             tweet_authors.append(tweet.user.screen_name)
+            tweet_author_ids.append(tweet.user.id)
+            tweet_ids_by_author[tweet.user.screen_name] = [tweet.id]
 
         if tweet_query is not None:
             print(f"Searching for \"{tweet_query}\".")
@@ -162,31 +490,120 @@ class Birdcall:
 
                 if tweet.id not in tweet_ids:
                     tweet_ids.append(tweet.id)
+                    tweet_ids_by_author.setdefault(tweet.user.screen_name, []).append(tweet.id)
 
                 if tweet.user.screen_name not in tweet_authors:
                     tweet_authors.append(tweet.user.screen_name)
+                    tweet_author_ids.append(tweet.user.id)
 
         tweet_ids = sorted(tweet_ids)
 
-        # Build up and execute the query.
-        query = ""
+        #
+        # Set up an executor to perform write actions on while we continue to search and filter. Retweets are
+        # spaced out by a token bucket so that we don't spam the Twitter API.
+        #
+        # NOTE: Since the core goal of this script is to retweet, a retweet failure will skip all other
+        #  desired actions (e.g. liking the tweet or following its author). The other actions are independent
+        #  of each other, so they are queued to run concurrently once the retweet succeeds.
+        #
+        executor = ActionExecutor(TokenBucket(1 / delay if delay > 0 else 0, burst), workers)
+
+        def process(reply, result):
+            if not self._retweet(reply.id):
+                #
+                # Unless the retweet failed for good, the reply must be searched for again by the next run.
+                #
+                if not ledger.has(reply.id, FAILED):
+                    unresolved_ids.add(result.id)
+
+                return False
+
+            if like:
+                executor.submit(self._like, reply.id)
 
-        for tweet_author in tweet_authors:
-            if len(query) > 0:
-                query += " OR "
+                #
+                # If we traversed into a quoted tweet, we also make sure to like the parent tweet.
+                #
+                if reply != result:
+                    executor.submit(self._like, result.id)
 
-            query += f"(to:{tweet_author} -from:{tweet_author})"
+            if follow:
+                executor.submit(self._follow, reply)
 
-        print(f"Searching for \"{query}\".")
+            return True
 
         count = 0
+        pending = set()
+        queued_ids = set()
+        unresolved_ids = set()
+        highest_id = None
+        lowest_id = None
+        exhausted = False
+
+        if stream is not None:
+            #
+            # Listen for replies to the authors as they are posted.
+            #
+            # NOTE: The stream pushes both the authors' own tweets and replies to them, so the same filtering
+            #  as for search results applies. Quoted tweets are looked up as replies arrive, rather than in
+            #  bulk, since waiting for a page of replies to accumulate would hold up processing them.
+            #
+            print(f"Listening for replies to {tweet_authors}.")
+
+            results = stream.filter(tweet_author_ids)
+        else:
+            #
+            # Build up and execute the query. Since there is one clause per author, it is split into as many
+            # shards as necessary to stay within the maximum query length.
+            #
+            # Each shard only searches for replies newer than the high-water mark of its authors' tweets (i.e. the
+            # newest reply to them that a previous run has already seen and processed), so that already-processed
+            # replies are not paged through again. If a previous run bailed before it had paged through every
+            # reply, the shard instead resumes paging from where that run left off (i.e. only searches for replies
+            # older than the ones it saw), and newer replies are searched for once those have been paged through.
+            queries = shard_query("", [f"(to:{author} -from:{author})" for author in tweet_authors])
+            since_ids = self._load_since_ids()
+            marks = {target_id: since_ids.get(str(target_id), {"since_id": target_id}) for target_id in tweet_ids}
+            shard_marks = {
+                shard: [
+                    marks[target_id]
+                    for author in tweet_authors if f"(to:{author} -from:{author})" in shard
+                    for target_id in tweet_ids_by_author[author]
+                ]
+                for shard in queries
+            }
+            shard_since_ids = {shard: min(mark["since_id"] for mark in shard_marks[shard]) for shard in queries}
+            shard_max_ids = {
+                shard: max(mark["max_id"] for mark in shard_marks[shard])
+                if all("max_id" in mark for mark in shard_marks[shard]) else None
+                for shard in queries
+            }
+
+            for shard in queries:
+                resume = f", up to {shard_max_ids[shard]}" if shard_max_ids[shard] else ""
+
+                print(f"Searching for \"{shard}\" (since {shard_since_ids[shard]}{resume}).")
+
+            results = self._search_shards(
+                queries,
+                lambda q: tweepy.Cursor(
+                    self.api.search_tweets,
+                    q=q,
+                    since_id=shard_since_ids[q],
+                    max_id=shard_max_ids[q],
+                    count=100,
+                    include_entities=False
+                ).items(),
+                workers
+            )
+
+            if traverse_quotes:
+                results = self._prefetch_quoted_statuses(results)
+
+        for result in results:
+            highest_id = max(highest_id or 0, result.id)
+            lowest_id = min(lowest_id or result.id, result.id)
 
-        for result in tweepy.Cursor(
-                self.api.search_tweets,
-                q=query,
-                since_id=tweet_ids[0],
-                include_entities=False
-        ).items():
             #
             # Make sure we actually care about this tweet.
             #
@@ -194,7 +611,7 @@ class Birdcall:
             #  versions), there is a chance that our result set will include tweets that were replies to
             #  more recent tweet than the desired one. We must filter out such results manually.
             #
-            if result.in_reply_to_status_id not in tweet_ids:
+            if result.in_reply_to_status_id not in tweet_ids or result.user.id in tweet_author_ids:
                 print(f"Skipping {result.id} as it is not a reply to {tweet_ids}.")
 
                 continue
@@ -214,9 +631,15 @@ class Birdcall:
 
             if traverse_quotes and hasattr(result, "quoted_status"):
                 # NOTE: The Tweet.quoted_status payload does not contain some useful flags – like favorited
-                #  or retweeted. So, unfortunately, we must fetch the full Tweet object for the quote.
+                #  or retweeted. So, unfortunately, we must use the full Tweet object for the quote (which has
+                #  been fetched in bulk along with the others quoted by the same page of results).
+
+                reply = self._lookup_statuses([result.quoted_status_id]).get(result.quoted_status_id)
 
-                reply = self.api.get_status(result.quoted_status_id, include_entities=False)
+                if reply is None:
+                    print(f"Skipping {result.id} as its quoted tweet ({result.quoted_status_id}) is unavailable.")
+
+                    continue
 
                 print(f"Traversed to quoted tweet ({reply.id}) in reply {result.id}).")
 
@@ -224,73 +647,83 @@ class Birdcall:
             # If we have already retweeted the reply, skip it.
             #
             # NOTE: The "retweeted" and "favorited" flags of the Twitter API's "Tweet" object do not appear
-            #  to be bullet-proof. So this is a best-effort check, but we still must handle failures
-            #  below.
+            #  to be bullet-proof. So we also check our own ledger of processed tweets, but we still must
+            #  handle failures below.
             #
-            if reply.retweeted:
+            if reply.retweeted or ledger.has(reply.id, RETWEETED | FAILED):
                 print(f"Skipping {result.id} as we have already processed it.")
 
                 continue
 
-            #
-            # Retweet, like, and follow the author of the actual tweet that we need to process. If we
-            # traversed into quoted tweets and liking is enabled, we also make sure to like the parent
-            # tweet.
-            #
-            # NOTE: Since the core goal of this script is to retweet, a retweet failure will skip all other
-            #  desired actions (e.g. liking the tweet or following its author).
-            #
-            try:
-                self.api.retweet(reply.id)
-
-                print("Retweeted %d." % reply.id)
-            except tweepy.TweepyException as e:
-                print(f"Failed to retweet {reply.id}. Will not count it. (error: {e})")
+            if reply.id in queued_ids:
+                print(f"Skipping {result.id} as it is already being processed.")
 
                 continue
 
-            if like:
-                try:
-                    self.api.create_favorite(reply.id)
+            #
+            # Queue the actual tweet that we need to process. Its retweet will be spaced out from the others
+            # by the executor, and we will keep filtering results in the meantime.
+            #
+            queued_ids.add(reply.id)
+            pending.add(executor.submit(process, reply, result, limited=True))
+
+            #
+            # Wait for pending retweets to complete whenever enough are in flight to reach our maximum
+            # number of retweets, and bail if we have retweeted our maximum number of replies.
+            #
+            while pending and count + len(pending) >= max_retweets:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                count += sum(future.result() for future in done)
 
-                    print("Liked %d." % reply.id)
-                except tweepy.TweepyException as e:
-                    print(f"Failed to like {reply.id}. (error: {e})")
+            if count >= max_retweets:
+                break
+        else:
+            exhausted = True
 
-                if reply != result:
-                    try:
-                        self.api.create_favorite(result.id)
+        if stream is not None:
+            stream.close()
 
-                        print("Liked %d." % result.id)
-                    except tweepy.TweepyException as e:
-                        print(f"Failed to like {result.id}. (error: {e})")
+        #
+        # Wait for any remaining retweets (and the actions that they spawn) to complete.
+        #
+        count += sum(future.result() for future in pending)
 
-            if follow:
-                try:
-                    self.api.create_friendship(reply.user.id)
+        executor.shutdown()
 
-                    print("Followed %d." % reply.user.id)
-                except tweepy.TweepyException as e:
-                    print(f"Failed to follow {reply.id}'s author ({reply.user.id}). (error: {e})")
+        #
+        # If we searched through every reply, advance the high-water marks of the tweets to the newest reply that
+        # has been seen (by this run, or by the runs that it resumed), or to just before the oldest reply that
+        # must be searched for again.
+        #
+        # If we bailed early, older replies (since results are newest-first) have not been seen yet, so the marks
+        # cannot move. Instead, the point to resume paging from (i.e. just before the oldest reply that we saw,
+        # or the newest reply that must be searched for again) is saved alongside them.
+        #
+        if stream is None:
+            new_marks = {}
 
-            #
-            # Increment the count and bail if we have retweeted our maximum number of replies.
-            #
-            count += 1
+            for target_id in tweet_ids:
+                top_id = max(marks[target_id].get("top_id", 0), highest_id or 0)
 
-            if count >= max_retweets:
-                break
+                if exhausted and top_id:
+                    new_marks[str(target_id)] = {
+                        "since_id": min([top_id, *(unresolved_id - 1 for unresolved_id in unresolved_ids)])
+                    }
+                elif not exhausted and lowest_id is not None:
+                    new_marks[str(target_id)] = {
+                        "since_id": marks[target_id]["since_id"],
+                        "max_id": max([lowest_id - 1, *unresolved_ids]),
+                        "top_id": top_id
+                    }
 
-            #
-            # Wait the delay interval so that we don't spam the Twitter API.
-            #
-            time.sleep(delay)
+            self._save_since_ids(new_marks)
 
         #
         # Log how many replies we found and retweeted.
         #
         print(f"Retweeted {count} replies to {tweet.id}.")
 
+    @instrumented
     def retweet_search(
             self,
             query,
@@ -299,28 +732,25 @@ class Birdcall:
             members=[],
             filter_count=15,
             like=False,
-            follow=False
+            follow=False,
+            workers=4
     ):
         """
         Given a search criteria, retweets a random result tweet. Also supports liking of said tweet and
         following its author.
         """
 
-        #
-        # Seed the random number generator so that we don't get the same results every time the script runs.
-        #
-        random.seed()
-
         #
         # Fetch a set of muted user ids. We will make sure to not retweet anything by these users (for some
         # reason, muted users' tweets occasionally slip through the search filter).
         #
-        muted_ids = []
-
-        for mute_id in tweepy.Cursor(self.api.get_muted_ids).items():
-            muted_ids.append(mute_id)
+        muted_ids = self._load_muted_ids()
 
-        print(f"Loaded {len(muted_ids)} mutes.")
+        #
+        # Load the ledger of tweets that we have already processed, so that we can skip them without spending
+        # API calls on them.
+        #
+        ledger = self._load_ledger()
 
         #
         # Interpolate dynamic values into the query.
@@ -330,52 +760,59 @@ class Birdcall:
         #
         # Process dynamic authorship filters into the query.
         #
-        usernames = []
+        # NOTE: Audiences are loaded as cached maps of user ids to screen names, so collecting them into a set
+        #  de-duplicates authors that appear in more than one audience.
+        #
+        usernames = set()
 
         if friends:
-            for account in tweepy.Cursor(self.api.get_friends, count=1000, skip_status=True, include_user_entities=False).items():
-                if account.screen_name not in usernames:
-                    usernames.append(account.screen_name)
+            usernames.update(self._load_audience(
+                "friends",
+                lambda: dict.fromkeys(tweepy.Cursor(self.api.get_friend_ids, count=5000).items())
+            ).values())
 
         if followers:
-            for account in tweepy.Cursor(self.api.get_followers, count=1000, skip_status=True, include_user_entities=False).items():
-                if account.screen_name not in usernames:
-                    usernames.append(account.screen_name)
+            usernames.update(self._load_audience(
+                "followers",
+                lambda: dict.fromkeys(tweepy.Cursor(self.api.get_follower_ids, count=5000).items())
+            ).values())
 
         if members and len(members) > 0:
-            for account in tweepy.Cursor(self.api.get_list_members, list_id=members, count=1000).items():
-                if account.screen_name not in usernames:
-                    usernames.append(account.screen_name)
-
-        if len(usernames) > 0:
-            random.shuffle(usernames)
-
-            count = 0
-            query += " ("
+            usernames.update(self._load_audience(
+                f"members_{members}",
+                lambda: {
+                    account.id: account.screen_name
+                    for account in tweepy.Cursor(self.api.get_list_members, list_id=members, count=1000).items()
+                }
+            ).values())
 
-            for username in usernames:
-                if count > 0:
-                    query += " OR "
+        usernames = list(usernames)
 
-                query += f"from:{username}"
-                count += 1
+        #
+        # Shard the authorship filters into the query.
+        #
+        # NOTE: Each author is a separate clause, so the query is split into as many shards as necessary to stay
+        #  within the maximum query length. A falsy filter count includes every author.
+        #
+        random.shuffle(usernames)
 
-                if count >= filter_count:
-                    break
+        if filter_count:
+            usernames = usernames[:filter_count]
 
-            query += ")"
+        queries = shard_query(query, [f"from:{username}" for username in usernames])
 
         #
         # Perform the search.
         #
-        print(f"Searching for \"{query}\".")
+        for shard in queries:
+            print(f"Searching for \"{shard}\".")
 
-        results = self.api.search_tweets(
-            q=query,
-            result_type='recent',
-            include_entities=False,
-            count=25
-        )
+        with self.metrics.span("search", shards=len(queries)):
+            results = self._search_shards(
+                queries,
+                lambda q: self.api.search_tweets(q=q, result_type='recent', include_entities=False, count=25),
+                workers
+            )
 
         print(f"Found {len(results)} search results.")
 
@@ -383,136 +820,879 @@ class Birdcall:
         # Retweet a random tweet from the search results. Attempt up to five times to find one that the bot
         # has not already retweeted.
         #
+        # NOTE: Tweets from muted users, and tweets that our ledger says have already been processed, are
+        #  filtered out up front so that they do not burn attempts.
+        #
         # NOTE: Since the goal of this script is primarily to retweet, we try to do that first. If it fails,
         #  we burn the attempt and move on to another. Otherwise, we proceed to try to like the tweet and
         #  follow its author.
         #
-        if len(results) > 0:
-            for _ in range(5):
-                tweet = random.choice(results)
-
-                if tweet.user.id in muted_ids:
-                    print(f"Skipping tweet ({tweet.id}) from muted user ({tweet.user.id}).")
+        candidates = []
 
-                    continue
+        for tweet in results:
+            if tweet.user.id in muted_ids:
+                print(f"Skipping tweet ({tweet.id}) from muted user ({tweet.user.id}).")
+            elif tweet.retweeted or ledger.has(tweet.id, RETWEETED | FAILED):
+                print(f"Skipping {tweet.id} as we have already processed it.")
+            else:
+                candidates.append(tweet)
 
-                try:
-                    self.api.retweet(tweet.id)
+        for tweet in random.sample(candidates, min(5, len(candidates))):
+            if not self._retweet(tweet.id):
+                continue
 
-                    print("Retweeted %d." % tweet.id)
-                except tweepy.TweepyException as e:
-                    print(f"Failed to retweet {tweet.id}. (error: {e}")
+            if like:
+                self._like(tweet.id)
 
-                    continue
+            if follow:
+                self._follow(tweet)
 
-                if like:
-                    try:
-                        self.api.create_favorite(tweet.id)
+            break
 
-                        print("Liked %d." % tweet.id)
-                    except tweepy.TweepyException as e:
-                        print(f"Failed to like {tweet.id}. (error: {e}")
+    @instrumented
+    def direct_message_followers(
+            self,
+            store: str,
+            message: str,
+            max_messages: int = None,
+            delay: float = 60,
+            burst: int = 1,
+            workers: int = 4,
+            output: str = None,
+            import_csv: str = None
+    ):
+        """
+        Sends a direct message to each follower in a follower store that has not already been messaged, and marks
+        them as messaged. The message is a template that is formatted with the follower's row (e.g. "Hi {name}!").
+        Messages are spaced out to an average of one per delay interval, with up to a burst of them allowed
+        back-to-back. The store can optionally be exported to a CSV file afterwards.
+
+        Followers can first be imported into the store from a CSV file (e.g. one downloaded without a store),
+        keeping whether they have already been messaged, so that they are not messaged again.
+
+        Followers are marked via the store's journal, so no files are rewritten. Each follower is marked as
+        "pending" before their message is sent and as messaged once it has been, so a campaign that is
+        interrupted can be resumed without messaging anyone twice. Followers whose messages may or may not have
+        been sent (i.e. that are still pending) are skipped and reported.
+        """
 
-                if follow:
-                    try:
-                        self.api.create_friendship(tweet.user.id)
+        #
+        # Make sure the message only refers to fields that followers have before sending it to anyone.
+        #
+        message.format_map(dict.fromkeys(FOLLOWER_FIELDS, ""))
 
-                        print("Followed %d." % tweet.user.id)
-                    except tweepy.TweepyException as e:
-                        print(f"Failed to follow {tweet.id}'s author ({tweet.user.id}). (error: {e}")
+        followers = FollowerStore(store)
 
-                break
+        if import_csv:
+            print(f"Imported {followers.import_csv(import_csv)} followers from {import_csv}.")
 
-    def tweet(self, tweet_path, media_path=None, delete_content=False, delete_media=False):
-        """
-        Tweets the content of a file, or of a random file in a directory. The id of the tweet is output and returned so
-        that it can be piped into subsequent programs if desired.
-        """
+        print(f"Loaded {len(followers)} followers.")
 
         #
-        # Seed the random number generator so that we don't get the same results every time the script runs.
+        # Set up an executor to send messages on while we continue to stream followers from the store.
+        #
+        # NOTE: Forbidden messages (e.g. to followers that do not accept messages from us) are marked as failed,
+        #  since retrying them would fail again. Other failures may be transient, so they are left unmarked to be
+        #  retried by the next campaign.
         #
-        random.seed()
+        executor = ActionExecutor(TokenBucket(1 / delay if delay > 0 else 0, burst), workers)
+
+        def send(row):
+            #
+            # Mark the follower as pending once their message is about to be sent (i.e. once the rate limit allows
+            # it), so that followers whose messages are still queued when we are interrupted are not left pending.
+            #
+            row = {**row, "direct_messaged": "pending"}
+
+            followers.update(row)
+
+            try:
+                self.api.send_direct_message(int(row["id"]), message.format_map(row))
+            except tweepy.Forbidden as e:
+                followers.update({**row, "direct_messaged": "failed"})
+
+                print(f"Failed to message {row['screen_name']}. (error: {e})")
+            except tweepy.TweepyException as e:
+                followers.update({**row, "direct_messaged": False})
+
+                print(f"Failed to message {row['screen_name']}. (error: {e})")
+            else:
+                followers.update({**row, "direct_messaged": True})
+                self.metrics.count("actions_total", action="direct_message", result="success")
+
+                print(f"Messaged {row['screen_name']}.")
+
+                return True
+
+            self.metrics.count("actions_total", action="direct_message", result="failure")
+
+            return False
+
+        count = 0
+        pending = set()
+        unresolved = 0
+
+        for row in followers.rows():
+            status = str(row["direct_messaged"])
+
+            if status == "pending":
+                unresolved += 1
+
+            if status != "False":
+                continue
+
+            #
+            # Wait for pending messages to be sent whenever there is one in flight for every worker, or enough to
+            # reach our maximum number of messages, and bail if we have sent our maximum number of messages.
+            #
+            while pending and (
+                    len(pending) >= workers or max_messages is not None and count + len(pending) >= max_messages
+            ):
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                count += sum(future.result() for future in done)
+
+            if max_messages is not None and count >= max_messages:
+                break
+
+            pending.add(executor.submit(send, row, limited=True))
+
+        count += sum(future.result() for future in pending)
+
+        executor.shutdown()
 
         #
-        # Determine whether we are dealing with a single file or a directory of files containing content to
-        # tweet.
+        # Compact and export the store if necessary.
         #
-        is_directory = os.path.isdir(tweet_path)
+        followers.maybe_compact()
+
+        if output:
+            followers.export(output)
 
-        if is_directory:
-            tweet_path = f"{tweet_path}/{random.choice(os.listdir(tweet_path))}"
+        if unresolved:
+            print(f"Skipped {unresolved} followers whose messages may have been interrupted while sending.")
+
+        print(f"Messaged {count} followers.")
+
+    @instrumented
+    def tweet(
+            self,
+            tweet_path,
+            media_path=None,
+            delete_content=False,
+            delete_media=False,
+            order="random",
+            preupload=0
+    ):
+        """
+        Tweets the content of a file, or of the next file queued in a directory. The id of the tweet is output and
+        returned so that it can be piped into subsequent programs if desired.
+
+        Files queued in directories are selected in a random order (in which each file is tweeted once before any
+        is tweeted again) or in the order that they were added ("fifo"). Files that are invalid, or that are
+        rejected when they are posted (e.g. as duplicates), are skipped and never selected again.
+
+        Media is resized and recompressed as necessary to fit the platform's limits, and is not uploaded again if it
+        was uploaded recently. The specified number of media files queued after this one can be uploaded in the
+        background, so that they are ready by the time they are tweeted.
+        """
 
         #
-        # If a media attachment was specified, determine whether we are dealing with a single file or a
-        # directory of files containing the media to upload.
+        # Determine whether we are dealing with a single file or a directory of files containing content to
+        # tweet, and whether a media attachment was specified as a single file or a directory of files containing
+        # the media to upload.
         #
-        if media_path:
-            is_directory = os.path.isdir(media_path)
+        content_queue = None
+        media_queue = None
 
-            if is_directory:
-                media_path = f"{media_path}/{random.choice(os.listdir(media_path))}"
+        if os.path.isdir(tweet_path):
+            content_queue = self._load_queue(tweet_path, validate_text, order)
+
+        if media_path and os.path.isdir(media_path):
+            media_queue = self._load_queue(media_path, validate_media, order)
 
         #
-        # Load the content that will be tweeted.
+        # Hold the queues until the files selected from them have been dequeued, so that concurrent calls never
+        # select the same files. They are always acquired in the same order, so that calls never deadlock.
         #
-        with open(tweet_path, "r") as file:
-            content = file.read()
+        with ExitStack() as stack:
+            for locked_queue in sorted({content_queue, media_queue} - {None}, key=lambda queue: queue.directory):
+                stack.enter_context(locked_queue.lock)
 
             #
-            # Tweet the content.
+            # Tweet the next files in the queues. Files that are rejected when they are posted (e.g. duplicates,
+            # or media in a format that the platform cannot process) are dequeued as invalid, and the next ones
+            # are tried instead.
             #
-            if media_path:
-                media = self.api.media_upload(filename=media_path)
-                tweet = self.api.update_status(status=content, media_ids=[media.media_id])
-            else:
-                tweet = self.api.update_status(status=content)
+            while True:
+                if content_queue:
+                    tweet_path = content_queue.peek()
+
+                if media_queue:
+                    media_path = media_queue.peek()
+
+                #
+                # Load the content that will be tweeted.
+                #
+                with open(tweet_path, "r") as file:
+                    content = file.read()
+
+                #
+                # Tweet the content.
+                #
+                try:
+                    media_id = self._load_media_uploader().upload(media_path) if media_path else None
+                except (tweepy.BadRequest, tweepy.Forbidden) as e:
+                    if not media_queue:
+                        raise
+
+                    media_queue.reject(f"was rejected when it was uploaded ({'; '.join(e.api_messages) or e})")
+
+                    continue
+
+                try:
+                    if media_id:
+                        tweet = self.api.update_status(status=content, media_ids=[media_id])
+                    else:
+                        tweet = self.api.update_status(status=content)
+                except (tweepy.BadRequest, tweepy.Forbidden) as e:
+                    # NOTE: Error 324 means that the attached media could not be processed, so it is the media
+                    #  rather than the content that is at fault.
+                    rejected_queue = media_queue if MEDIA_ERROR in e.api_codes else content_queue
+
+                    if not rejected_queue:
+                        raise
+
+                    rejected_queue.reject(f"was rejected when it was posted ({'; '.join(e.api_messages) or e})")
+
+                    continue
+
+                break
 
             #
             # Print out the id of the new tweet (in case it needs to be piped into another script).
             #
             print(tweet.id)
 
-        #
-        # Delete files if necessary.
-        #
-        if delete_content:
-            os.remove(tweet_path)
-
-        if media_path and delete_media:
-            os.remove(media_path)
+            #
+            # Dequeue the files that were tweeted, and delete them if necessary.
+            #
+            if content_queue:
+                content_queue.advance(delete_content)
+            elif delete_content:
+                os.remove(tweet_path)
+
+            if media_queue:
+                media_queue.advance(delete_media)
+
+                #
+                # Media uploaded ahead of time is only worth it if its ids are persisted for the runs that tweet it.
+                #
+                if preupload and self._cache_path("media_ids.json") is None:
+                    print("Skipping uploading media ahead of time, as no cache directory is configured.")
+                elif preupload:
+                    self._load_media_uploader().preupload(media_queue.upcoming(preupload))
+            elif media_path and delete_media:
+                os.remove(media_path)
 
         #
         # Return the tweet id.
         #
         return tweet.id
 
-    def unfollow_traitors(self):
+    @instrumented
+    def unfollow_traitors(self, workers=4):
         """
         Unfollows anyone that is not currently following the authenticated user.
         """
 
         #
-        # Get a handle on the authenticated user.
+        # Fetch the ids of all friends and all followers in bulk, and determine which friends are not
+        # following us.
+        #
+        # NOTE: The ids endpoints return up to 5,000 ids per call, so this is a handful of calls rather than a
+        #  relationship lookup for every single friend.
         #
-        me = self.api.verify_credentials()
+        with self.metrics.span("relationship_load"):
+            friend_ids = set(tweepy.Cursor(self.api.get_friend_ids, count=5000).items())
+            follower_ids = set(tweepy.Cursor(self.api.get_follower_ids, count=5000).items())
+        traitor_ids = friend_ids - follower_ids
 
         #
-        # Iterate through all friends. Destroy the friendship if they are not following us.
+        # Refresh the cache of friends with the ones that we just fetched. It is kept up to date as traitors are
+        # unfollowed.
         #
-        count = 0
+        with self._friends_lock:
+            self._friend_ids = set(friend_ids)
+            self._friend_ids_fetched_at = time.time()
 
-        for friend in tweepy.Cursor(self.api.get_friends, count=1000, skip_status=True, include_user_entities=False).items():
-            relationship = self.api.get_friendship(source_id=me.id, target_id=friend.id)
+        print(f"Found {len(traitor_ids)} of {len(friend_ids)} friends that are not following back.")
 
-            if not relationship[0].followed_by:
-                try:
-                    self.api.destroy_friendship(friend.id)
+        #
+        # Destroy the friendships using a bounded pool of workers.
+        #
+        # NOTE: The API client waits out rate limits on its own, so any worker that exhausts the endpoint's
+        #  budget will simply block until it resets. Keeping the pool small keeps us from hammering the
+        #  endpoint in the meantime.
+        #
+        def unfollow(traitor_id):
+            try:
+                self.api.destroy_friendship(user_id=traitor_id)
+                self._update_friends(traitor_id, False)
+                self.metrics.count("actions_total", action="unfollow", result="success")
+
+                print(f"Unfollowed {traitor_id}.")
+
+                return True
+            except tweepy.TweepyException as e:
+                self.metrics.count("actions_total", action="unfollow", result="failure")
+
+                print(f"Failed to unfollow {traitor_id}. (error: {e})")
+
+                return False
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            count = sum(executor.map(unfollow, traitor_ids))
+
+        self._save_friend_ids()
+
+        print(f"Unfollowed {count} users.")
+
+    def _search_shards(self, queries, search, workers=4):
+        """
+        Runs a search function (which takes a query and returns an iterable of tweets) for each of the
+        specified query shards concurrently, and returns their results merged and de-duplicated by tweet id,
+        newest first. A single query is simply searched as is.
+        """
+
+        if len(queries) == 1:
+            return search(queries[0])
+
+        tweets = {}
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for results in executor.map(lambda q: list(search(q)), queries):
+                for tweet in results:
+                    tweets.setdefault(tweet.id, tweet)
+
+        return sorted(tweets.values(), key=lambda tweet: tweet.id, reverse=True)
+
+    def _prefetch_quoted_statuses(self, results):
+        """
+        Yields search results, fetching the full tweets that they quote in bulk (a page of up to 100 results
+        at a time) so that they are cached by the time each result is processed.
+        """
+
+        results = iter(results)
+
+        while True:
+            page = list(islice(results, 100))
+
+            if not page:
+                return
+
+            self._lookup_statuses([result.quoted_status_id for result in page if hasattr(result, "quoted_status")])
+
+            yield from page
+
+    def _lookup_statuses(self, status_ids):
+        """
+        Returns a map of the specified ids to their full tweets. Tweets are fetched in bulk (up to 100 per
+        call) and kept in a short-lived cache, so only those that have not been fetched recently are looked up.
+        Tweets that could not be fetched (e.g. because they were deleted) are omitted, and are also cached (as
+        missing) so that they are not looked up again until the cache expires.
+        """
+
+        with self._cache_lock:
+            if self._statuses is None:
+                self._statuses = {}
+
+        #
+        # Evict expired tweets, so that the cache does not grow without bound in long-running processes.
+        #
+        now = time.time()
+
+        expired_ids = [
+            status_id
+            for status_id, (fetched_at, _) in list(self._statuses.items())
+            if now - fetched_at >= self.status_cache_ttl
+        ]
+
+        for status_id in expired_ids:
+            self._statuses.pop(status_id, None)
+
+        missing_ids = [status_id for status_id in dict.fromkeys(status_ids) if status_id not in self._statuses]
+
+        for i in range(0, len(missing_ids), 100):
+            batch = missing_ids[i:i + 100]
+
+            with self.metrics.span("status_lookup"):
+                found = {status.id: status for status in self.api.lookup_statuses(batch, include_entities=False)}
+
+            for status_id in batch:
+                self._statuses[status_id] = (now, found.get(status_id))
+
+        return {
+            status_id: self._statuses[status_id][1]
+            for status_id in status_ids
+            if self._statuses.get(status_id, (0, None))[1] is not None
+        }
+
+    def _lookup_users(self, user_ids, workers=4):
+        """
+        Returns a map of the specified ids to their users. Users are looked up in bulk (up to 100 per call), with
+        up to the specified number of calls in flight at a time. Calls wait for the endpoint's rate limit to
+        reset if its budget is exhausted. Users that could not be found (e.g. because they are suspended) are
+        omitted.
+        """
+
+        def lookup(batch):
+            time.sleep(self.budget.wait_time("users/lookup") if self.budget else 0)
+
+            # NOTE: The endpoint responds with "not found" if none of the users in the batch could be found.
+            try:
+                return self.api.lookup_users(user_id=batch, include_entities=False)
+            except tweepy.NotFound:
+                return []
+
+        batches = [user_ids[i:i + 100] for i in range(0, len(user_ids), 100)]
+
+        if len(batches) <= 1:
+            return {account.id: account for batch in batches for account in lookup(batch)}
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return {account.id: account for accounts in executor.map(lookup, batches) for account in accounts}
+
+    def _retweet(self, tweet_id):
+        """
+        Retweets the specified tweet and records it in the ledger, logging (rather than raising) any failure.
+        Returns whether the retweet succeeded.
+
+        NOTE: Only forbidden retweets (e.g. of tweets that have already been retweeted, or whose authors have
+         blocked us) are recorded as failures, since retrying them would fail again. Other failures may be
+         transient.
+        """
+
+        try:
+            self.api.retweet(tweet_id)
+            self._load_ledger().record(tweet_id, RETWEETED)
+            self.metrics.count("actions_total", action="retweet", result="success")
+
+            print("Retweeted %d." % tweet_id)
+
+            return True
+        except tweepy.Forbidden as e:
+            self._load_ledger().record(tweet_id, FAILED)
+
+            print(f"Failed to retweet {tweet_id}. (error: {e})")
+        except tweepy.TweepyException as e:
+            print(f"Failed to retweet {tweet_id}. (error: {e})")
+
+        self.metrics.count("actions_total", action="retweet", result="failure")
+
+        return False
+
+    def _like(self, tweet_id):
+        """
+        Likes the specified tweet (unless the ledger says that we already have), logging (rather than raising)
+        any failure.
+        """
+
+        ledger = self._load_ledger()
+
+        if ledger.has(tweet_id, LIKED):
+            return
+
+        try:
+            self.api.create_favorite(tweet_id)
+            ledger.record(tweet_id, LIKED)
+            self.metrics.count("actions_total", action="like", result="success")
+
+            print("Liked %d." % tweet_id)
+        except tweepy.TweepyException as e:
+            self.metrics.count("actions_total", action="like", result="failure")
+
+            print(f"Failed to like {tweet_id}. (error: {e})")
+
+    def _follow(self, tweet):
+        """
+        Follows the author of the specified tweet, logging (rather than raising) any failure. Authors that we
+        already follow (according to the cache of friends) are skipped without spending an API call.
+        """
+
+        self._load_friend_ids()
+
+        #
+        # Claim the author before following them, so that concurrent follows of the same author are skipped.
+        #
+        # NOTE: Claims are made in the shared cache itself (rather than in the set that was returned above), so
+        #  that they are not lost if the cache is replaced in the meantime.
+        #
+        with self._friends_lock:
+            friend_ids = self._friend_ids
+
+            if tweet.user.id in friend_ids or getattr(tweet.user, "following", False):
+                friend_ids.add(tweet.user.id)
+                self.metrics.count("actions_total", action="follow", result="skipped")
+
+                print(f"Skipping follow of {tweet.user.id} as we already follow them.")
+
+                return
+
+            friend_ids.add(tweet.user.id)
+
+        try:
+            self.api.create_friendship(user_id=tweet.user.id)
+            self._update_friends(tweet.user.id, True, tweet.user.screen_name)
+            self._save_friend_ids()
+            self.metrics.count("actions_total", action="follow", result="success")
+
+            print("Followed %d." % tweet.user.id)
+        except tweepy.TweepyException as e:
+            with self._friends_lock:
+                self._friend_ids.discard(tweet.user.id)
+
+            self.metrics.count("actions_total", action="follow", result="failure")
+
+            print(f"Failed to follow {tweet.id}'s author ({tweet.user.id}). (error: {e})")
+
+    def _load_queue(self, directory, validate, order):
+        """
+        Returns the queue of files in a directory, keeping it in memory for subsequent calls and (if caching to
+        disk is enabled) persisting its index across runs.
+        """
+
+        with self._cache_lock:
+            if self._queues is None:
+                self._queues = {}
+
+            key = (os.path.abspath(directory), order)
+
+            if key not in self._queues:
+                index_path = self._cache_path(f"queue_{order}_{hashlib.sha1(key[0].encode()).hexdigest()[:16]}.json")
+
+                self._queues[key] = ContentQueue(directory, index_path, validate, order)
+
+            return self._queues[key]
+
+    def _load_media_uploader(self):
+        """
+        Returns the uploader of media to attach to tweets, which caches the ids of recently uploaded media (on disk,
+        if caching to disk is enabled).
+        """
+
+        with self._cache_lock:
+            if self._media_uploader is None or self._media_uploader.api is not self.api:
+                self._media_uploader = MediaUploader(self.api, self.metrics, self._cache_path("media_ids.json"))
+
+            return self._media_uploader
+
+    def _load_ledger(self):
+        """
+        Returns the ledger of processed tweets, which is kept on disk if a cache directory is configured.
+        """
+
+        with self._cache_lock:
+            if self._ledger is None:
+                self._ledger = Ledger(self._cache_path("ledger.bin"))
+
+                print(f"Loaded {len(self._ledger)} processed tweets.")
+
+            return self._ledger
+
+    def _load_since_ids(self):
+        """
+        Returns a map of the ids of tweets (as strings) to the marks of how far replies to them have been
+        processed, kept in memory and (if caching to disk is enabled) persisted across runs. Each mark has the
+        id of the newest reply that has been processed ("since_id") and, if a run bailed before it had paged
+        through every newer reply, the id of the reply to resume paging from ("max_id") and of the newest reply
+        that it saw ("top_id").
+        """
+
+        with self._cache_lock:
+            if self._since_ids is None:
+                self._since_ids = {}
+
+                path = self._cache_path("since_ids.json")
+
+                if path and os.path.exists(path):
+                    with open(path, mode="r") as f:
+                        # NOTE: Marks used to only be the ids of the newest processed replies.
+                        self._since_ids = {
+                            tweet_id: mark if isinstance(mark, dict) else {"since_id": mark}
+                            for tweet_id, mark in json.load(f).items()
+                        }
+
+            return self._since_ids
+
+    def _save_since_ids(self, since_ids):
+        """
+        Updates the marks of the specified tweets (whose high-water marks never move backwards) and persists
+        them.
+        """
+
+        with self._cache_lock:
+            marks = self._load_since_ids()
+
+            for tweet_id, mark in since_ids.items():
+                if mark["since_id"] >= marks.get(tweet_id, {"since_id": 0})["since_id"]:
+                    marks[tweet_id] = mark
+
+            path = self._cache_path("since_ids.json")
+
+            if path:
+                self._save_json(path, marks)
+
+    def _load_muted_ids(self):
+        """
+        Returns the set of user ids muted by the authenticated user. The set is cached in memory and, if a
+        cache directory is configured, on disk. It is only re-fetched from the API once it is older than the
+        mute cache's time-to-live.
+        """
+
+        with self._mutes_lock:
+            #
+            # If the in-memory copy is still fresh, use it as is.
+            #
+            if self._muted_ids is not None and time.time() - self._muted_ids_fetched_at < self.mute_cache_ttl:
+                return self._muted_ids
+
+            #
+            # Otherwise, try to load a fresh copy from disk.
+            #
+            path = self._cache_path("muted_ids.json")
+
+            if path and os.path.exists(path):
+                with open(path, mode="r") as f:
+                    state = json.load(f)
+
+                if time.time() - state["fetched_at"] < self.mute_cache_ttl:
+                    self._muted_ids = set(state["ids"])
+                    self._muted_ids_fetched_at = state["fetched_at"]
+
+                    print(f"Loaded {len(self._muted_ids)} cached mutes.")
+
+                    return self._muted_ids
+
+            #
+            # Otherwise, fetch the mutes from the API and cache them.
+            #
+            with self.metrics.span("mute_load"):
+                self._muted_ids = set(tweepy.Cursor(self.api.get_muted_ids).items())
+            self._muted_ids_fetched_at = time.time()
+
+            if path:
+                self._save_json(path, {"fetched_at": self._muted_ids_fetched_at, "ids": list(self._muted_ids)})
+
+            print(f"Loaded {len(self._muted_ids)} mutes.")
+
+            return self._muted_ids
+
+    def _load_friend_ids(self):
+        """
+        Returns the set of user ids that the authenticated user follows. The set is cached in memory and, if a
+        cache directory is configured, on disk, and it is kept up to date by our own follows and unfollows. It is
+        only re-fetched from the API once it is older than the friend cache's time-to-live (to pick up changes
+        made elsewhere).
+        """
+
+        #
+        # If the in-memory copy is still fresh, use it as is.
+        #
+        with self._friends_lock:
+            if self._friend_ids is not None and time.time() - self._friend_ids_fetched_at < self.friend_cache_ttl:
+                return self._friend_ids
+
+        #
+        # Otherwise, load it once on behalf of all concurrent callers. Whoever acquires the lock after the load
+        # finds the fresh copy and uses it as is.
+        #
+        # NOTE: This is a separate lock from the one guarding the cache's contents, so that follows and unfollows
+        #  of cached friends are not blocked while the friends are paged through.
+        #
+        with self._friends_load_lock:
+            with self._friends_lock:
+                if self._friend_ids is not None and time.time() - self._friend_ids_fetched_at < self.friend_cache_ttl:
+                    return self._friend_ids
+
+            #
+            # Try to load a fresh copy from disk.
+            #
+            path = self._cache_path("friend_ids.json")
+
+            if path and os.path.exists(path):
+                with open(path, mode="r") as f:
+                    state = json.load(f)
+
+                if time.time() - state["fetched_at"] < self.friend_cache_ttl:
+                    with self._friends_lock:
+                        self._friend_ids = set(state["ids"])
+                        self._friend_ids_fetched_at = state["fetched_at"]
+
+                    print(f"Loaded {len(self._friend_ids)} cached friends.")
+
+                    return self._friend_ids
+
+            #
+            # Otherwise, reuse the cached audience of friends if it is loaded and fresh, or fetch the friends from
+            # the API.
+            #
+            # NOTE: The audience omits friends whose screen names could not be looked up (e.g. because they are
+            #  suspended), which at worst means an attempt to follow one of them again.
+            #
+            with self._friends_lock:
+                fetched_at, screen_names = (self._audiences or {}).get("friends", (0, {}))
+                friend_ids = set(screen_names)
+
+            if time.time() - fetched_at >= self.audience_cache_ttl:
+                with self.metrics.span("friend_load"):
+                    friend_ids = set(tweepy.Cursor(self.api.get_friend_ids, count=5000).items())
+
+                fetched_at = time.time()
+
+            with self._friends_lock:
+                self._friend_ids = friend_ids
+                self._friend_ids_fetched_at = fetched_at
 
-                    count += 1
+            self._save_friend_ids()
+
+            print(f"Loaded {len(friend_ids)} friends.")
+
+            return friend_ids
+
+    def _update_friends(self, user_id, following, screen_name=None):
+        """
+        Records that we have followed or unfollowed a user in the cache of friends (and in the cached audience of
+        friends, if it is loaded).
+        """
+
+        with self._friends_lock:
+            if self._friend_ids is not None:
+                if following:
+                    self._friend_ids.add(user_id)
+                else:
+                    self._friend_ids.discard(user_id)
+
+            friends = (self._audiences or {}).get("friends")
+
+            if friends is not None:
+                if following and screen_name:
+                    friends[1][user_id] = screen_name
+                elif not following:
+                    friends[1].pop(user_id, None)
+
+    def _save_friend_ids(self):
+        """
+        Persists the cache of friends to disk, if a cache directory is configured.
+        """
+
+        path = self._cache_path("friend_ids.json")
+
+        if not path or self._friend_ids is None:
+            return
+
+        with self._friends_lock:
+            state = {"fetched_at": self._friend_ids_fetched_at, "ids": list(self._friend_ids)}
+
+            self._save_json(path, state)
+
+    def _load_audience(self, name, fetch):
+        """
+        Returns a map of user ids to screen names for the named audience (e.g. the authenticated user's
+        friends). The map is cached in memory and, if a cache directory is configured, on disk, and it is only
+        refreshed once it is older than the audience cache's time-to-live.
+
+        The fetch function must return a map of the audience's current user ids to their screen names, or to
+        None if they are unknown. Refreshes are incremental: only users that are new to the audience are
+        looked up to find their screen names.
+        """
+
+        with self._cache_lock:
+            if self._audiences is None:
+                self._audiences = {}
+
+            lock = self._audience_locks.setdefault(name, threading.Lock())
+
+        with lock:
+            #
+            # If the in-memory copy is still fresh, use it as is.
+            #
+            fetched_at, screen_names = self._audiences.get(name, (0, {}))
+
+            if time.time() - fetched_at < self.audience_cache_ttl:
+                return screen_names
+
+            #
+            # Otherwise, try to load a copy from disk. If it is fresh, use it as is.
+            #
+            # NOTE: JSON object keys are always strings, so the map is stored as a list of pairs to preserve the
+            #  user ids as integers.
+            #
+            path = self._cache_path(f"audience_{name}.json")
+
+            if path and os.path.exists(path):
+                with open(path, mode="r") as f:
+                    state = json.load(f)
+
+                fetched_at, screen_names = state["fetched_at"], dict(state["screen_names"])
+
+                if time.time() - fetched_at < self.audience_cache_ttl:
+                    self._audiences[name] = (fetched_at, screen_names)
+
+                    print(f"Loaded {len(screen_names)} cached {name}.")
+
+                    return screen_names
+
+            #
+            # Otherwise, refresh the audience. Users that have left it are dropped, and users that have joined it
+            # are looked up in bulk (up to 100 per call) if their screen names are not already known.
+            #
+            with self.metrics.span("audience_load", audience=name):
+                current = fetch()
+                screen_names = {
+                    user_id: current[user_id] or screen_names.get(user_id)
+                    for user_id in current
+                }
+                unknown_ids = [user_id for user_id, screen_name in screen_names.items() if screen_name is None]
+
+                for account in self._lookup_users(unknown_ids).values():
+                    screen_names[account.id] = account.screen_name
+
+            # NOTE: Users that could not be looked up (e.g. because they are suspended) are dropped.
+            screen_names = {user_id: screen_name for user_id, screen_name in screen_names.items() if screen_name}
+            fetched_at = time.time()
+
+            self._audiences[name] = (fetched_at, screen_names)
+
+            if path:
+                self._save_json(path, {"fetched_at": fetched_at, "screen_names": list(screen_names.items())})
+
+            print(f"Loaded {len(screen_names)} {name} ({len(unknown_ids)} new).")
+
+            return screen_names
+
+    def _cache_path(self, name):
+        """
+        Returns the path of the named file in the cache directory (which is taken from the runtime
+        environment if it has not been explicitly set), or None if caching to disk is disabled.
+        """
+
+        cache_dir = self.cache_dir or os.getenv("BIRDCALL_CACHE_DIR")
+
+        if not cache_dir:
+            return None
+
+        os.makedirs(cache_dir, exist_ok=True)
+
+        return os.path.join(cache_dir, name)
+
+    @staticmethod
+    def _save_json(path, state):
+        """
+        Atomically saves a JSON-serializable state object to the specified path, so that an interruption
+        mid-write can never leave a corrupted file behind.
+        """
 
-                    print(f"Unfollowed {friend.id} ({friend.screen_name}).")
-                except tweepy.TweepyException as e:
-                    print(f"Failed to unfollow {friend.id} ({friend.screen_name}). (error: {e})")
+        with open(f"{path}.tmp", mode="w") as f:
+            json.dump(state, f)
 
-        print(f"Unfollowed {count} users.")
\ No newline at end of file
+        os.replace(f"{path}.tmp", path)
@@ -0,0 +1,88 @@
+import re
+import threading
+import time
+from urllib.parse import urlparse
+
+
+class RateBudget:
+    """
+    Tracks the remaining quota and reset time of each Twitter API endpoint from the rate limit headers of
+    its responses, so that work against an exhausted endpoint can be deferred (e.g. by the daemon) until it
+    resets, rather than stalling work that could be done with others.
+    """
+
+    def __init__(self):
+        self._budgets = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def endpoint(url: str):
+        """
+        Returns the name of the endpoint (e.g. "search/tweets") that the specified request URL belongs to.
+        Path segments that are ids are replaced with ":id" so that all requests to an endpoint share a
+        budget.
+        """
+
+        path = urlparse(url).path
+        path = re.sub(r"^/1\.1/|\.json$", "", path)
+
+        return re.sub(r"(?<=/)\d+(?=/|$)", ":id", path)
+
+    def hook(self, response, *args, **kwargs):
+        """
+        A response hook that can be installed on the API client's HTTP session to record the rate limit
+        headers of every response.
+        """
+
+        remaining = response.headers.get("x-rate-limit-remaining")
+        reset = response.headers.get("x-rate-limit-reset")
+
+        if remaining is not None and reset is not None:
+            self.update(
+                self.endpoint(response.url),
+                int(remaining),
+                int(reset),
+                int(response.headers.get("x-rate-limit-limit", remaining))
+            )
+
+        return response
+
+    def update(self, endpoint: str, remaining: int, reset: float, limit: int = None):
+        """
+        Records the remaining quota of an endpoint, the epoch time at which it resets, and (optionally) its
+        total quota per window.
+        """
+
+        with self._lock:
+            self._budgets[endpoint] = {"limit": limit, "remaining": remaining, "reset": reset}
+
+    def budgets(self):
+        """
+        Returns a snapshot of the known budget of each endpoint, keyed by endpoint name. Budgets whose
+        window has reset are reported as fully replenished.
+        """
+
+        now = time.time()
+
+        with self._lock:
+            snapshot = {endpoint: dict(budget) for endpoint, budget in self._budgets.items()}
+
+        for budget in snapshot.values():
+            if budget["reset"] <= now and budget["limit"] is not None:
+                budget["remaining"] = budget["limit"]
+
+        return snapshot
+
+    def wait_time(self, endpoint: str):
+        """
+        Returns the number of seconds until the specified endpoint has budget again, or zero if it has budget
+        now (or if nothing is known about it yet).
+        """
+
+        with self._lock:
+            budget = self._budgets.get(endpoint)
+
+        if budget is None or budget["remaining"] > 0:
+            return 0
+
+        return max(0, budget["reset"] - time.time())
@@ -0,0 +1,293 @@
+import json
+import os.path
+import random
+import re
+import threading
+
+from .media import can_resize
+
+#
+# The maximum length of a tweet, the length that every URL counts as (since they are shortened), and the media
+# formats (and their maximum sizes in bytes) that can be attached to
+# one, as documented for the standard v1.1 API.
+#
+MAX_TWEET_LENGTH = 280
+URL_LENGTH = 23
+MAX_MEDIA_SIZES = {
+    ".gif": 15 * 2 ** 20,
+    ".jpeg": 5 * 2 ** 20,
+    ".jpg": 5 * 2 ** 20,
+    ".mov": 512 * 2 ** 20,
+    ".mp4": 512 * 2 ** 20,
+    ".png": 5 * 2 ** 20,
+    ".webp": 5 * 2 ** 20
+}
+
+URL_PATTERN = re.compile(r"https?://\S+", re.IGNORECASE)
+
+
+def tweet_length(content: str):
+    """
+    Returns the length of a tweet as counted by the platform, on which every URL counts as the same length
+    regardless of its own.
+    """
+
+    return len(URL_PATTERN.sub("", content)) + URL_LENGTH * len(URL_PATTERN.findall(content))
+
+
+def validate_text(path: str):
+    """
+    Returns the reason that a file cannot be tweeted as text, or None if it can.
+    """
+
+    try:
+        with open(path, mode="r", encoding="utf-8") as f:
+            content = f.read()
+    except UnicodeDecodeError:
+        return "is not UTF-8 text"
+
+    if not content.strip():
+        return "is empty"
+
+    if tweet_length(content) > MAX_TWEET_LENGTH:
+        return f"is longer than {MAX_TWEET_LENGTH} characters"
+
+    return None
+
+
+def validate_media(path: str):
+    """
+    Returns the reason that a file cannot be attached to a tweet, or None if it can. Images that are too large
+    are allowed if they can be resized and recompressed before they are uploaded.
+    """
+
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension not in MAX_MEDIA_SIZES:
+        return f"is not one of the supported formats ({', '.join(MAX_MEDIA_SIZES)})"
+
+    if os.path.getsize(path) > MAX_MEDIA_SIZES[extension] and not can_resize(path):
+        return f"is larger than {MAX_MEDIA_SIZES[extension] // 2 ** 20} MiB"
+
+    return None
+
+
+class ContentQueue:
+    """
+    A persisted index of the files queued in a directory, so that selecting one does not list (and selecting
+    one that can actually be posted does not open) every file in the directory.
+
+    If the index is persisted, files are validated once, when they are first indexed. Otherwise (since the
+    index would have to be rebuilt by every run), files are only validated when they are about to be selected.
+    Either way, invalid files are excluded (and logged). Files are selected in the order that they were added
+    ("fifo"), or in a random order ("random") in which every file is selected once before any is selected
+    again. Hidden files are ignored.
+
+    The directory is only re-listed when its modification time changes, i.e. when files have been added or
+    removed by something other than the queue. The index is kept in memory, and is also persisted to a file if
+    an index path is specified.
+
+    The queue is not thread-safe. Callers that share it must hold its lock from selecting a file until it has
+    been dequeued.
+    """
+
+    def __init__(self, directory: str, index_path: str = None, validate=validate_text, order: str = "random"):
+        if order not in ("fifo", "random"):
+            raise ValueError(f"Unknown order \"{order}\". Must be one of ['fifo', 'random'].")
+
+        self.directory = directory
+        self.index_path = index_path
+        self.validate = validate
+        self.order = order
+
+        #
+        # Load the index. Entries before the cursor have already been selected in the current cycle.
+        #
+        self.entries = []
+        self.invalid = {}
+        self.cursor = 0
+        self.mtime = None
+
+        self.lock = threading.RLock()
+
+        self._validated = set()
+
+        if index_path and os.path.exists(index_path):
+            with open(index_path, mode="r") as f:
+                state = json.load(f)
+
+            if state["directory"] == os.path.abspath(directory) and state["order"] == order:
+                self.entries = state["entries"]
+                self.invalid = state["invalid"]
+                self.cursor = state["cursor"]
+                self.mtime = state["mtime"]
+
+    def __len__(self):
+        self.refresh()
+
+        return len(self.entries)
+
+    def peek(self):
+        """
+        Returns the path of the next file in the queue, without dequeuing it.
+        """
+
+        self.refresh()
+
+        while True:
+            if not self.entries:
+                raise ValueError(f"There are no valid files queued in {self.directory}.")
+
+            #
+            # Start a new cycle once every entry has been selected.
+            #
+            if self.cursor >= len(self.entries):
+                self.cursor = 0
+
+                if self.order == "random":
+                    random.shuffle(self.entries)
+
+                self._save()
+
+            if self._check(self.cursor):
+                return os.path.join(self.directory, self.entries[self.cursor])
+
+    def upcoming(self, count: int):
+        """
+        Returns the paths of up to the specified number of files that are next in the queue, in the current
+        cycle.
+        """
+
+        paths = []
+        index = self.cursor
+
+        while index < len(self.entries) and len(paths) < count:
+            if self._check(index):
+                paths.append(os.path.join(self.directory, self.entries[index]))
+                index += 1
+
+        return paths
+
+    def advance(self, delete: bool = False):
+        """
+        Dequeues the file returned by "peek()", optionally deleting it.
+        """
+
+        if not delete:
+            self.cursor += 1
+            self._save()
+
+            return
+
+        unchanged = os.stat(self.directory).st_mtime_ns == self.mtime
+
+        os.remove(os.path.join(self.directory, self.entries.pop(self.cursor)))
+
+        #
+        # Our own deletion does not require the directory to be listed again (unless it had already changed).
+        #
+        if unchanged:
+            self.mtime = os.stat(self.directory).st_mtime_ns
+
+        self._save()
+
+    def reject(self, reason: str):
+        """
+        Dequeues the file returned by "peek()" as invalid (e.g. because it was rejected when it was posted), so
+        that it is never selected again.
+        """
+
+        name = self.entries.pop(self.cursor)
+        self.invalid[name] = reason
+
+        print(f"Skipping {name} as it {reason}.")
+
+        self._save()
+
+    def refresh(self):
+        """
+        Indexes files that have been added to the directory, and drops ones that have been removed, if it has
+        changed since it was last indexed.
+        """
+
+        mtime = os.stat(self.directory).st_mtime_ns
+
+        if mtime == self.mtime:
+            return
+
+        names = {name for name in os.listdir(self.directory) if not name.startswith(".")}
+
+        #
+        # Drop removed files, keeping the cursor on the same entry.
+        #
+        self.cursor -= sum(1 for name in self.entries[:self.cursor] if name not in names)
+        self.entries = [name for name in self.entries if name in names]
+        self.invalid = {name: reason for name, reason in self.invalid.items() if name in names}
+
+        self._validated &= names
+
+        #
+        # Index new files (validating them now if the index is persisted). In random order, they are shuffled in
+        # among the entries that have not been selected yet in the current cycle.
+        #
+        known = set(self.entries) | set(self.invalid)
+        new = sorted(names - known, key=lambda name: (os.path.getmtime(os.path.join(self.directory, name)), name))
+
+        for name in new:
+            reason = self.validate(os.path.join(self.directory, name)) if self.index_path else None
+
+            if reason is None:
+                self.entries.append(name)
+            else:
+                self.invalid[name] = reason
+
+                print(f"Skipping {name} as it {reason}.")
+
+        if self.order == "random":
+            remaining = self.entries[self.cursor:]
+            random.shuffle(remaining)
+            self.entries[self.cursor:] = remaining
+
+        self.mtime = mtime
+        self._save()
+
+    def _check(self, index):
+        """
+        Validates the entry at the specified index if it has not been validated yet, dropping it (and returning
+        False) if it is invalid.
+        """
+
+        name = self.entries[index]
+
+        if self.index_path or name in self._validated:
+            return True
+
+        reason = self.validate(os.path.join(self.directory, name))
+
+        if reason is None:
+            self._validated.add(name)
+
+            return True
+
+        del self.entries[index]
+        self.invalid[name] = reason
+
+        print(f"Skipping {name} as it {reason}.")
+
+        return False
+
+    def _save(self):
+        if not self.index_path:
+            return
+
+        with open(f"{self.index_path}.tmp", mode="w") as f:
+            json.dump({
+                "directory": os.path.abspath(self.directory),
+                "order": self.order,
+                "mtime": self.mtime,
+                "cursor": self.cursor,
+                "entries": self.entries,
+                "invalid": self.invalid
+            }, f)
+
+        os.replace(f"{self.index_path}.tmp", self.index_path)
@@ -0,0 +1,94 @@
+import heapq
+import json
+import time
+import traceback
+
+#
+# Operations that can be scheduled, and the rate-limited endpoints that each one primarily depends on. A job is
+# deferred (rather than run and left to sleep) while any of its endpoints' budgets is exhausted.
+#
+OPERATIONS = {
+    "direct_message_followers": ("direct_messages/events/new",),
+    "download_followers": ("followers/ids", "users/lookup"),
+    "retweet_replies": ("search/tweets",),
+    "retweet_search": ("search/tweets",),
+    "tweet": ("statuses/update",),
+    "unfollow_traitors": ("friends/ids",)
+}
+
+
+def wait_time(budget, operation: str):
+    """
+    Returns the number of seconds until every endpoint that the specified operation depends on has budget.
+    """
+
+    return max(budget.wait_time(endpoint) for endpoint in OPERATIONS[operation]) if budget else 0
+
+
+class Daemon:
+    """
+    Runs a schedule of Birdcall operations in a single long-running process. Every job shares one
+    authenticated client, so they also share its warm in-memory caches (e.g. mutes, audiences, and the ledger
+    of processed tweets) and its rate limit budget.
+
+    Each job is a dict with the name of an "operation", the number of seconds to run it "every", and the
+    keyword "args" to run it with. Jobs may optionally specify a "delay" in seconds before their first run.
+    """
+
+    def __init__(self, birdcall, jobs: list):
+        for job in jobs:
+            if job["operation"] not in OPERATIONS:
+                raise ValueError(f"Unknown operation \"{job['operation']}\". Must be one of {list(OPERATIONS)}.")
+
+        self.birdcall = birdcall
+        self.jobs = jobs
+
+    @classmethod
+    def from_file(cls, birdcall, path: str):
+        """
+        Creates a daemon from a JSON schedule file of the form {"jobs": [...]}.
+        """
+
+        with open(path, mode="r") as f:
+            return cls(birdcall, json.load(f)["jobs"])
+
+    def run(self, until: float = None):
+        """
+        Runs jobs as they come due, forever (or until the specified epoch time). A job that fails is logged
+        and rescheduled as usual.
+        """
+
+        now = time.time()
+        queue = [(now + job.get("delay", 0), index) for index, job in enumerate(self.jobs)]
+
+        heapq.heapify(queue)
+
+        while queue:
+            due_at, index = heapq.heappop(queue)
+            job = self.jobs[index]
+
+            if until is not None and due_at > until:
+                break
+
+            time.sleep(max(0, due_at - time.time()))
+
+            #
+            # If any of the job's endpoints is out of budget, defer it until the budget resets.
+            #
+            wait = wait_time(self.birdcall.budget, job["operation"])
+
+            if wait > 0:
+                print(f"Deferring {job['operation']} for {wait:.0f}s until its rate limit resets.")
+
+                heapq.heappush(queue, (time.time() + wait, index))
+
+                continue
+
+            print(f"Running {job['operation']}.")
+
+            try:
+                getattr(self.birdcall, job["operation"])(**job.get("args", {}))
+            except Exception:
+                print(f"Failed to run {job['operation']}. (error: {traceback.format_exc()})")
+
+            heapq.heappush(queue, (max(due_at + job["every"], time.time()), index))
@@ -0,0 +1,429 @@
+from collections import Counter
+from datetime import timedelta
+import json
+import re
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.hooks import dispatch_hook
+from requests.structures import CaseInsensitiveDict
+import tweepy
+
+from .budget import RateBudget
+from .stream import ReplayStream
+
+#
+# Requests per 15-minute window of each endpoint that Birdcall uses, as documented for the standard v1.1 API.
+# Endpoints that are not listed are not rate limited.
+#
+RATE_LIMITS = {
+    "account/verify_credentials": 75,
+    "followers/ids": 15,
+    "followers/list": 15,
+    "friends/ids": 15,
+    "friends/list": 15,
+    "friendships/show": 180,
+    "lists/members": 900,
+    "mutes/users/ids": 15,
+    "search/tweets": 180,
+    "statuses/lookup": 900,
+    "statuses/show": 900,
+    "users/lookup": 900
+}
+
+CREATED_AT = "Sat Oct 17 12:00:00 +0000 2026"
+
+
+class FakeTwitter(requests.Session):
+    """
+    An offline stand-in for the Twitter API that can be installed as the HTTP session of a "tweepy.API"
+    client, so that Birdcall can be exercised (and benchmarked) without a network or a live account.
+
+    It serves a synthetic account (id 1, "birdcall") with the specified numbers of followers, friends, and
+    mutes, along with a synthetic timeline of tweets in which a handful of root tweets by "user2" are replied
+    to (and occasionally quoted) by everyone else. Users are generated on demand from their ids, so graphs of
+    millions of followers are cheap to serve.
+
+    Rate limits are simulated per endpoint. When an endpoint is exhausted, the fake either rejects requests
+    with a 429 until its window resets ("reject"), or fast-forwards a virtual clock to the reset and records
+    the time that would have been spent waiting ("fast_forward").
+    """
+
+    def __init__(
+            self,
+            followers: int = 1000,
+            friends: int = 1000,
+            mutes: int = 10,
+            tweets: int = 1000,
+            roots: int = 3,
+            rate_limits: dict = None,
+            window: float = 15 * 60,
+            on_exhausted: str = "fast_forward"
+    ):
+        super().__init__()
+
+        self.followers = followers
+        self.tweets = tweets
+        self.roots = roots
+        self.rate_limits = RATE_LIMITS if rate_limits is None else rate_limits
+        self.window = window
+        self.on_exhausted = on_exhausted
+
+        #
+        # Half of the account's friends follow it back, and the other half do not. Follower ids start at 2 so
+        # that they never collide with the account itself.
+        #
+        first_friend = 2 + max(followers - friends // 2, 0)
+
+        self.friends = dict.fromkeys(range(first_friend, first_friend + friends))
+        self.mutes = list(range(2, 2 + mutes))
+        self.retweeted = set()
+        self.favorited = set()
+        self.direct_messages = []
+        self.posted = []
+
+        self.calls = Counter()
+        self.rate_limited_time = 0.0
+
+        self._friend_ids = None
+        self._tweets_by_author = None
+        self._windows = {}
+        self._next_id = tweets + 1
+        self._lock = threading.RLock()
+
+    @classmethod
+    def api(cls, wait_on_rate_limit=True, **kwargs):
+        """
+        Returns a "tweepy.API" client that is backed by a new fake with the specified parameters.
+        """
+
+        api = tweepy.API(
+            tweepy.OAuth1UserHandler("fake", "fake", "fake", "fake"),
+            wait_on_rate_limit=wait_on_rate_limit
+        )
+        api.session = cls(**kwargs)
+
+        return api
+
+    def replay_stream(self, interval: float = 0):
+        """
+        Returns an offline stand-in for a filtered stream that pushes the fake's tweets in the order that they
+        were posted, optionally spaced out by an interval in seconds.
+        """
+
+        return ReplayStream((self._tweet(tweet_id) for tweet_id in range(1, self.tweets + 1)), interval)
+
+    def now(self):
+        """
+        Returns the current time on the fake's clock, which runs ahead of the real one by however much time
+        has been fast-forwarded past rate limits.
+        """
+
+        return time.time() + self.rate_limited_time
+
+    def request(self, method, url, params=None, data=None, json=None, hooks=None, **kwargs):
+        endpoint = RateBudget.endpoint(url)
+        params = {**(params or {}), **(data or {})}
+
+        started_at = time.perf_counter()
+
+        with self._lock:
+            self.calls[endpoint] += 1
+
+            response = self._limit(endpoint)
+
+            if response is None:
+                response = self._handle(endpoint, url, params, json)
+
+            self._stamp(endpoint, response)
+
+        response.url = url
+        response.elapsed = timedelta(seconds=time.perf_counter() - started_at)
+        response.request = requests.Request(method, url).prepare()
+
+        return dispatch_hook("response", self.hooks, response)
+
+    #
+    # Rate limiting.
+    #
+
+    def _limit(self, endpoint):
+        """
+        Consumes a request from the endpoint's budget, returning a 429 response if it is exhausted (or None
+        if the request may proceed).
+        """
+
+        limit = self.rate_limits.get(endpoint)
+
+        if limit is None:
+            return None
+
+        remaining, reset = self._windows.get(endpoint, (limit, self.now() + self.window))
+
+        if reset <= self.now():
+            remaining, reset = limit, self.now() + self.window
+
+        if remaining <= 0:
+            if self.on_exhausted != "fast_forward":
+                return self._error(88, "Rate limit exceeded", 429)
+
+            self.rate_limited_time += reset - self.now()
+            remaining, reset = limit, self.now() + self.window
+
+        self._windows[endpoint] = (remaining - 1, reset)
+
+        return None
+
+    def _stamp(self, endpoint, response):
+        """
+        Adds the endpoint's rate limit headers to a response.
+        """
+
+        if endpoint in self._windows:
+            remaining, reset = self._windows[endpoint]
+
+            response.headers["x-rate-limit-limit"] = str(self.rate_limits[endpoint])
+            response.headers["x-rate-limit-remaining"] = str(max(remaining, 0))
+            response.headers["x-rate-limit-reset"] = str(int(reset - self.rate_limited_time))
+
+    #
+    # Endpoint handlers.
+    #
+
+    def _handle(self, endpoint, url, params, payload):
+        """
+        Routes a request to the handler for its endpoint.
+        """
+
+        path_id = re.search(r"/(\d+)\.json$", urlparse(url).path)
+
+        handlers = {
+            "account/verify_credentials": lambda: self._user(1),
+            "direct_messages/events/new": lambda: self._direct_message(payload),
+            "favorites/create": lambda: self._favorite(int(params["id"])),
+            "followers/ids": lambda: self._page(range(2, 2 + self.followers), params, 5000, "ids"),
+            "followers/list": lambda: self._page(range(2, 2 + self.followers), params, 200, "users"),
+            "friends/ids": lambda: self._page(self._friends(), params, 5000, "ids"),
+            "friends/list": lambda: self._page(self._friends(), params, 200, "users"),
+            "friendships/create": lambda: self._follow(int(params["user_id"])),
+            "friendships/destroy": lambda: self._unfollow(int(params["user_id"])),
+            "friendships/show": lambda: self._friendship(int(params["target_id"])),
+            "lists/members": lambda: self._page(range(2, 2 + self.followers), params, 5000, "users"),
+            "media/upload": lambda: self._media(params),
+            "mutes/users/ids": lambda: self._page(self.mutes, params, 5000, "ids"),
+            "search/tweets": lambda: self._search(params),
+            "statuses/retweet/:id": lambda: self._retweet(int(path_id.group(1))),
+            "statuses/lookup": lambda: [self._tweet(int(i)) for i in params["id"].split(",")],
+            "statuses/show": lambda: self._tweet(int(params["id"])),
+            "statuses/update": lambda: self._post(params),
+            "users/lookup": lambda: [self._user(int(i)) for i in params["user_id"].split(",")]
+        }
+
+        if endpoint not in handlers:
+            return self._error(34, "Sorry, that page does not exist.", 404)
+
+        result = handlers[endpoint]()
+
+        return result if isinstance(result, requests.Response) else self._response(result)
+
+    def _page(self, ids, params, max_count, key):
+        """
+        Returns a cursored page of user ids (or of users generated from them).
+        """
+
+        cursor = int(params.get("cursor", -1))
+        start = max(cursor, 0)
+        end = start + min(int(params.get("count", max_count)), max_count)
+        page = ids[start:end]
+
+        return {
+            key: list(page) if key == "ids" else [self._user(user_id) for user_id in page],
+            "next_cursor": end if end < len(ids) else 0,
+            "previous_cursor": -start if start else 0
+        }
+
+    def _friends(self):
+        """
+        Returns the account's friend ids as a list, which is cached until the friendships change.
+        """
+
+        if self._friend_ids is None:
+            self._friend_ids = list(self.friends)
+
+        return self._friend_ids
+
+    def _follow(self, user_id):
+        self.friends[user_id] = None
+        self._friend_ids = None
+
+        return self._user(user_id)
+
+    def _unfollow(self, user_id):
+        self.friends.pop(user_id, None)
+        self._friend_ids = None
+
+        return self._user(user_id)
+
+    def _friendship(self, user_id):
+        following = user_id in self.friends
+        followed_by = 2 <= user_id < 2 + self.followers
+
+        return {
+            "relationship": {
+                "source": {"id": 1, "following": following, "followed_by": followed_by},
+                "target": {"id": user_id, "following": followed_by, "followed_by": following}
+            }
+        }
+
+    def _search(self, params):
+        """
+        Returns the newest page of tweets matching the query's "from:" and "to:" filters that are newer than
+        "since_id" and no newer than "max_id". Other search terms are ignored.
+        """
+
+        query = params.get("q", "")
+        authors = set(re.findall(r"(?<!-)from:(\w+)", query))
+        recipients = set(re.findall(r"(?<!-)to:(\w+)", query))
+        since_id = int(params.get("since_id", 0))
+        max_id = int(params.get("max_id", self.tweets))
+        count = min(int(params.get("count", 15)), 100)
+        statuses = []
+
+        #
+        # If the query filters by author, only consider the authors' tweets rather than the whole timeline.
+        #
+        if authors:
+            if self._tweets_by_author is None:
+                self._tweets_by_author = {}
+
+                for tweet_id in range(1, self.tweets + 1):
+                    self._tweets_by_author.setdefault(self._tweet(tweet_id)["user"]["screen_name"], []).append(tweet_id)
+
+            tweet_ids = sorted(
+                (tweet_id for author in authors for tweet_id in self._tweets_by_author.get(author, [])),
+                reverse=True
+            )
+        else:
+            tweet_ids = range(min(max_id, self.tweets), since_id, -1)
+
+        for tweet_id in tweet_ids:
+            if not since_id < tweet_id <= max_id:
+                continue
+
+            tweet = self._tweet(tweet_id)
+
+            if recipients and tweet["in_reply_to_screen_name"] not in recipients:
+                continue
+
+            statuses.append(tweet)
+
+            if len(statuses) >= count:
+                break
+
+        return {"statuses": statuses, "search_metadata": {"count": count}}
+
+    def _retweet(self, tweet_id):
+        if tweet_id in self.retweeted:
+            return self._error(327, "You have already retweeted this Tweet.", 403)
+
+        self.retweeted.add(tweet_id)
+
+        return {**self._tweet(self._new_id()), "retweeted_status": self._tweet(tweet_id)}
+
+    def _favorite(self, tweet_id):
+        if tweet_id in self.favorited:
+            return self._error(139, "You have already favorited this status.", 403)
+
+        self.favorited.add(tweet_id)
+
+        return self._tweet(tweet_id)
+
+    def _post(self, params):
+        tweet = {**self._tweet(self._new_id()), "text": params.get("status", "")}
+        tweet["user"] = self._user(1)
+
+        self.posted.append(tweet)
+
+        return tweet
+
+    def _media(self, params):
+        if params.get("command") == "APPEND":
+            return self._response(None, 204)
+
+        media_id = params.get("media_id") or self._new_id()
+
+        return {"media_id": int(media_id), "media_id_string": str(media_id)}
+
+    def _direct_message(self, payload):
+        message = payload["event"]["message_create"]
+
+        self.direct_messages.append((int(message["target"]["recipient_id"]), message["message_data"]["text"]))
+
+        return {"event": {**payload["event"], "id": str(self._new_id()), "created_timestamp": "0"}}
+
+    def _new_id(self):
+        self._next_id += 1
+
+        return self._next_id
+
+    #
+    # Synthetic objects.
+    #
+
+    def _user(self, user_id):
+        return {
+            "id": user_id,
+            "id_str": str(user_id),
+            "screen_name": "birdcall" if user_id == 1 else f"user{user_id}",
+            "name": f"User {user_id}",
+            "location": "",
+            "description": f"Synthetic user {user_id}.",
+            "url": None,
+            "following": user_id in self.friends
+        }
+
+    def _tweet(self, tweet_id):
+        """
+        Generates a tweet from its id. The first few tweets are roots by "user2", and every other tweet after
+        them replies to one of the roots. Every fifth reply quotes the tweet before it.
+        """
+
+        author_id = 2 if tweet_id <= self.roots else 3 + (tweet_id * 7919) % max(self.followers, 100)
+        tweet = {
+            "id": tweet_id,
+            "id_str": str(tweet_id),
+            "text": f"Synthetic tweet {tweet_id}.",
+            "created_at": CREATED_AT,
+            "user": self._user(author_id),
+            "in_reply_to_status_id": None,
+            "in_reply_to_user_id": None,
+            "in_reply_to_screen_name": None,
+            "retweeted": tweet_id in self.retweeted,
+            "favorited": tweet_id in self.favorited
+        }
+
+        if tweet_id > self.roots and tweet_id % 2 == 0:
+            tweet["in_reply_to_status_id"] = tweet_id % self.roots + 1
+            tweet["in_reply_to_user_id"] = 2
+            tweet["in_reply_to_screen_name"] = "user2"
+
+            if tweet_id % 10 == 0:
+                tweet["quoted_status_id"] = tweet_id - 1
+                tweet["quoted_status"] = {"id": tweet_id - 1, "id_str": str(tweet_id - 1), "text": ""}
+
+        return tweet
+
+    @classmethod
+    def _error(cls, code, message, status):
+        return cls._response({"errors": [{"code": code, "message": message}]}, status)
+
+    @staticmethod
+    def _response(body, status=200):
+        response = requests.Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict({"content-type": "application/json"})
+        response._content = b"" if body is None else json.dumps(body).encode()
+
+        return response
@@ -0,0 +1,119 @@
+from concurrent.futures import ProcessPoolExecutor
+import json
+import os.path
+import traceback
+
+from .daemon import OPERATIONS
+from .metrics import Metrics
+
+#
+# Credentials of each account in a manifest, and the environment variables that they are authenticated with.
+#
+CREDENTIALS = {
+    "consumer_key": "TWITTER_CONSUMER_KEY",
+    "consumer_secret": "TWITTER_CONSUMER_SECRET",
+    "access_token": "TWITTER_ACCESS_TOKEN",
+    "access_secret": "TWITTER_ACCESS_SECRET"
+}
+
+
+class Fleet:
+    """
+    Runs a Birdcall operation across many accounts concurrently, in a pool of worker processes.
+
+    Each account is a dict with a unique "name" and its credentials. Accounts may optionally specify "args" of
+    their own, a map of operation names to keyword arguments that take precedence over the ones an operation
+    is run with. Each account is authenticated in its own worker, so it has its own rate limit budget, and its
+    caches are kept in its own subdirectory of the cache directory (if there is one).
+    """
+
+    def __init__(self, accounts: list, cache_dir: str = None):
+        names = [account["name"] for account in accounts]
+
+        if len(set(names)) != len(names):
+            raise ValueError("Account names must be unique.")
+
+        self.accounts = accounts
+        self.cache_dir = cache_dir
+        self.metrics = Metrics()
+
+    @classmethod
+    def from_file(cls, path: str, cache_dir: str = None):
+        """
+        Creates a fleet from a JSON manifest file of the form {"accounts": [...]}.
+        """
+
+        with open(path, mode="r") as f:
+            return cls(json.load(f)["accounts"], cache_dir)
+
+    def run(self, operation: str, workers: int = None, **kwargs):
+        """
+        Runs an operation with the specified keyword arguments across every account, with up to the specified
+        number of accounts at a time (or all of them at once). Returns a map of account names to results, each
+        a dict with the operation's "result" or the "error" that it failed with.
+
+        The metrics of every account are aggregated into the "metrics" attribute, labeled by account.
+        """
+
+        if operation not in OPERATIONS:
+            raise ValueError(f"Unknown operation \"{operation}\". Must be one of {list(OPERATIONS)}.")
+
+        results = {}
+
+        with ProcessPoolExecutor(max_workers=workers or len(self.accounts)) as executor:
+            futures = {
+                account["name"]: executor.submit(
+                    _run_account,
+                    account,
+                    operation,
+                    {**kwargs, **account.get("args", {}).get(operation, {})},
+                    os.path.join(self.cache_dir, account["name"]) if self.cache_dir else None
+                )
+                for account in self.accounts
+            }
+
+            for name, future in futures.items():
+                result = future.result()
+
+                self.metrics.merge(result.pop("metrics"), account=name)
+
+                results[name] = result
+
+                print(f"{'Failed' if 'error' in result else 'Finished'} {operation} for {name}.")
+
+        return results
+
+
+def _run_account(account, operation, kwargs, cache_dir):
+    """
+    Authenticates as an account and runs an operation as it, in a worker process.
+    """
+
+    from .birdcall import Birdcall
+
+    o = Birdcall()
+
+    #
+    # Authenticate with the account's credentials and run the operation. Any failure (including missing
+    # credentials) is reported as the account's result, rather than aborting the rest of the fleet.
+    #
+    # NOTE: Birdcall gives credentials in the environment precedence over the ones it is passed, so the
+    #  account's credentials are set in the (worker process's) environment.
+    #
+    try:
+        os.environ.update({variable: account[credential] for credential, variable in CREDENTIALS.items()})
+
+        o.auth()
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+            o.cache_dir = cache_dir
+
+        result = {"result": getattr(o, operation)(**kwargs)}
+    except Exception:
+        result = {"error": traceback.format_exc()}
+
+    result["metrics"] = o.metrics.to_json()
+
+    return result
@@ -0,0 +1,22 @@
+import importlib.util
+import sys
+
+
+def lazy_import(name: str):
+    """
+    Returns the named module without actually importing it until one of its attributes is first accessed.
+    This keeps heavy dependencies (e.g. tweepy and, through it, requests) from slowing down cold starts of
+    processes that never end up needing them.
+    """
+
+    if name in sys.modules:
+        return sys.modules[name]
+
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+
+    return module
@@ -0,0 +1,71 @@
+import array
+import os.path
+import threading
+
+RETWEETED = 1
+LIKED = 2
+FAILED = 4
+
+
+class Ledger:
+    """
+    A compact, persistent record of the tweets that have already been processed (i.e. retweeted, liked, or
+    permanently failed to be retweeted), so that they can be skipped without spending an API call on them.
+
+    Records are appended to the ledger file as pairs of 64-bit integers (a tweet id and a flag), and are
+    indexed in memory by tweet id for constant-time lookups. If no path is specified, the ledger is only kept
+    in memory.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path
+
+        self._flags = {}
+        self._lock = threading.Lock()
+
+        if path and os.path.exists(path):
+            records = array.array("q")
+
+            with open(path, mode="rb+") as f:
+                data = f.read()
+
+                #
+                # Drop a record that was torn by a crash mid-append, so that later appends stay aligned.
+                #
+                torn = len(data) % (2 * records.itemsize)
+
+                if torn:
+                    data = data[:-torn]
+                    f.truncate(len(data))
+
+                records.frombytes(data)
+
+            for i in range(0, len(records) - 1, 2):
+                self._flags[records[i]] = self._flags.get(records[i], 0) | records[i + 1]
+
+    def __len__(self):
+        return len(self._flags)
+
+    def has(self, tweet_id: int, flag: int):
+        """
+        Returns whether the specified tweet has been recorded with any of the specified flags.
+        """
+
+        return bool(self._flags.get(tweet_id, 0) & flag)
+
+    def record(self, tweet_id: int, flag: int):
+        """
+        Records the specified tweet with the specified flag, appending it to the ledger file if it is new.
+        """
+
+        with self._lock:
+            flags = self._flags.get(tweet_id, 0)
+
+            if flags & flag:
+                return
+
+            self._flags[tweet_id] = flags | flag
+
+            if self.path:
+                with open(self.path, mode="ab") as f:
+                    array.array("q", [tweet_id, flag]).tofile(f)
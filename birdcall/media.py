@@ -0,0 +1,208 @@
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import io
+import json
+import os.path
+import threading
+import time
+
+#
+# Limits of images that can be attached to tweets, the largest file that can be uploaded in a single request
+# (larger ones are uploaded in chunks), and how long uploaded media can be attached to tweets for, as documented
+# for the standard v1.1 API.
+#
+MAX_IMAGE_SIZE = 5 * 2 ** 20
+MAX_IMAGE_DIMENSION = 4096
+MAX_SIMPLE_UPLOAD_SIZE = 5 * 2 ** 20
+MEDIA_ID_TTL = 24 * 60 * 60
+
+#
+# The media categories that animated GIFs and videos must be uploaded with (in chunks, after which they are
+# processed asynchronously) to be attached to tweets at their larger size limits.
+#
+MEDIA_CATEGORIES = {
+    ".gif": "tweet_gif",
+    ".mov": "tweet_video",
+    ".mp4": "tweet_video"
+}
+
+#
+# Image formats that can be resized and recompressed (if Pillow is installed).
+#
+RESIZABLE_FORMATS = (".jpeg", ".jpg", ".png", ".webp")
+
+
+def can_resize(path: str):
+    """
+    Returns whether the specified image can be resized and recompressed to fit within the platform's limits,
+    which requires the optional Pillow dependency.
+    """
+
+    if os.path.splitext(path)[1].lower() not in RESIZABLE_FORMATS:
+        return False
+
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        return False
+
+    return True
+
+
+def prepare_image(path: str):
+    """
+    Resizes and recompresses an image that exceeds the platform's limits, returning the filename and contents
+    to upload instead of it, or None if it can be uploaded as-is (or cannot be resized).
+    """
+
+    if not can_resize(path):
+        return None
+
+    from PIL import Image
+
+    with Image.open(path) as image:
+        if os.path.getsize(path) <= MAX_IMAGE_SIZE and max(image.size) <= MAX_IMAGE_DIMENSION:
+            return None
+
+        image.thumbnail((MAX_IMAGE_DIMENSION, MAX_IMAGE_DIMENSION))
+
+        #
+        # Keep transparent images as PNGs, and recompress everything else as JPEGs of decreasing quality. Either
+        # way, images that still do not fit are downscaled until they do.
+        #
+        name = os.path.splitext(os.path.basename(path))[0]
+
+        if image.mode in ("LA", "P", "RGBA"):
+            filename, formats = f"{name}.png", [{"format": "PNG", "optimize": True}]
+        else:
+            image = image.convert("RGB")
+            filename, formats = f"{name}.jpg", [
+                {"format": "JPEG", "quality": quality, "optimize": True} for quality in (85, 75, 65, 55, 45)
+            ]
+
+        while True:
+            for options in formats:
+                buffer = io.BytesIO()
+                image.save(buffer, **options)
+
+                if buffer.tell() <= MAX_IMAGE_SIZE:
+                    return filename, buffer
+
+            image = image.resize((max(1, image.width * 3 // 4), max(1, image.height * 3 // 4)))
+
+
+class MediaUploader:
+    """
+    Uploads media to attach to tweets, resizing and recompressing images that exceed the platform's limits and
+    uploading large files in chunks.
+
+    The ids of uploaded media are cached by the hash of their content until shortly before they expire (and
+    persisted to a file, if a cache path is specified), so media that has been uploaded recently is never
+    uploaded again. Media can also be uploaded ahead of time, in the background.
+    """
+
+    def __init__(self, api, metrics, cache_path: str = None, workers: int = 2):
+        self.api = api
+        self.metrics = metrics
+        self.cache_path = cache_path
+
+        self._media_ids = {}
+        self._pending = {}
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._lock = threading.Lock()
+
+        if cache_path and os.path.exists(cache_path):
+            with open(cache_path, mode="r") as f:
+                self._media_ids = {digest: tuple(entry) for digest, entry in json.load(f).items()}
+
+    def upload(self, path: str):
+        """
+        Returns the id of the uploaded media for the specified file, uploading it if it has not been uploaded
+        recently (or waiting for it if it is already being uploaded in the background).
+        """
+
+        digest = self._digest(path)
+
+        with self._lock:
+            media_id, expires_at = self._media_ids.get(digest, (None, 0))
+
+            if media_id is not None and expires_at > time.time():
+                self.metrics.count("media_cache_hits_total")
+
+                return media_id
+
+            future = self._pending.get(digest)
+
+        if future is not None:
+            return future.result()
+
+        return self._upload(path, digest)
+
+    def preupload(self, paths: list):
+        """
+        Uploads the specified files in the background, so that they are ready by the time they are tweeted.
+        """
+
+        for path in paths:
+            digest = self._digest(path)
+
+            with self._lock:
+                if digest in self._pending or self._media_ids.get(digest, (None, 0))[1] > time.time():
+                    continue
+
+                self._pending[digest] = self._executor.submit(self._upload, path, digest)
+
+    def _upload(self, path, digest):
+        try:
+            prepared = prepare_image(path)
+
+            with self.metrics.span("media_upload"):
+                if prepared is None:
+                    category = MEDIA_CATEGORIES.get(os.path.splitext(path)[1].lower())
+
+                    media = self.api.media_upload(
+                        filename=path,
+                        chunked=category is not None or os.path.getsize(path) > MAX_SIMPLE_UPLOAD_SIZE,
+                        media_category=category
+                    )
+                else:
+                    filename, buffer = prepared
+                    buffer.seek(0)
+
+                    media = self.api.media_upload(filename=filename, file=buffer)
+
+            #
+            # Cache the media id until shortly before it expires, so that it is never attached after expiring.
+            #
+            ttl = getattr(media, "expires_after_secs", None) or MEDIA_ID_TTL
+
+            with self._lock:
+                self._media_ids[digest] = (media.media_id, time.time() + ttl * 0.9)
+
+                self._save()
+
+            return media.media_id
+        finally:
+            with self._lock:
+                self._pending.pop(digest, None)
+
+    def _save(self):
+        if not self.cache_path:
+            return
+
+        now = time.time()
+
+        with open(f"{self.cache_path}.tmp", mode="w") as f:
+            json.dump({digest: entry for digest, entry in self._media_ids.items() if entry[1] > now}, f)
+
+        os.replace(f"{self.cache_path}.tmp", self.cache_path)
+
+    @staticmethod
+    def _digest(path):
+        sha256 = hashlib.sha256()
+
+        with open(path, mode="rb") as f:
+            for chunk in iter(lambda: f.read(2 ** 20), b""):
+                sha256.update(chunk)
+
+        return sha256.hexdigest()
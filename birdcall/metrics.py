@@ -0,0 +1,231 @@
+from collections import Counter, deque
+from contextlib import contextmanager
+import functools
+import json
+import math
+import os.path
+import threading
+import time
+
+from .budget import RateBudget
+
+#
+# Upper bounds (in seconds) of the buckets of latency histograms.
+#
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, math.inf)
+
+
+class Metrics:
+    """
+    Records timing spans, counters, and latency histograms for Birdcall's operations, their phases, and their
+    API requests, and exports them in JSON or Prometheus text format.
+
+    Only the most recent spans are kept, so that long-running processes do not accumulate them forever.
+    """
+
+    def __init__(self, max_spans: int = 1000):
+        self.spans = deque(maxlen=max_spans)
+        self.counters = Counter()
+        self.histograms = {}
+
+        self._lock = threading.Lock()
+
+    def count(self, name: str, value: int = 1, **labels):
+        """
+        Increments a counter.
+        """
+
+        with self._lock:
+            self.counters[(name, self._labels(labels))] += value
+
+    def observe(self, name: str, seconds: float, **labels):
+        """
+        Records a duration in a latency histogram.
+        """
+
+        with self._lock:
+            histogram = self.histograms.setdefault((name, self._labels(labels)), {
+                "buckets": [0] * len(BUCKETS),
+                "sum": 0.0,
+                "count": 0
+            })
+
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    histogram["buckets"][i] += 1
+
+            histogram["sum"] += seconds
+            histogram["count"] += 1
+
+    @contextmanager
+    def span(self, name: str, **labels):
+        """
+        Times the enclosed block, recording it as a span and in the "span_seconds" histogram.
+        """
+
+        start = time.time()
+        started_at = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - started_at
+
+            self.observe("span_seconds", duration, span=name, **labels)
+
+            with self._lock:
+                self.spans.append({"name": name, "labels": labels, "start": start, "duration": duration})
+
+    def hook(self, response, *args, **kwargs):
+        """
+        A response hook that can be installed on the API client's HTTP session to count and time every API
+        request by endpoint.
+        """
+
+        endpoint = RateBudget.endpoint(response.url)
+
+        self.count("api_requests_total", endpoint=endpoint, status=str(response.status_code))
+
+        if response.elapsed is not None:
+            self.observe("api_request_seconds", response.elapsed.total_seconds(), endpoint=endpoint)
+
+        return response
+
+    def to_json(self):
+        """
+        Returns the metrics as a JSON document.
+        """
+
+        with self._lock:
+            return json.dumps({
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in self.counters.items()
+                ],
+                "histograms": [
+                    {
+                        "name": name,
+                        "labels": dict(labels),
+                        "buckets": dict(zip(map(str, BUCKETS), histogram["buckets"])),
+                        "sum": histogram["sum"],
+                        "count": histogram["count"]
+                    }
+                    for (name, labels), histogram in self.histograms.items()
+                ],
+                "spans": list(self.spans)
+            })
+
+    def merge(self, document: str, **labels):
+        """
+        Merges metrics exported by another instance (e.g. in another process) as JSON into these ones, adding
+        the specified labels to all of them.
+        """
+
+        document = json.loads(document)
+
+        with self._lock:
+            for counter in document["counters"]:
+                self.counters[(counter["name"], self._labels({**counter["labels"], **labels}))] += counter["value"]
+
+            for merged in document["histograms"]:
+                histogram = self.histograms.setdefault((merged["name"], self._labels({**merged["labels"], **labels})), {
+                    "buckets": [0] * len(BUCKETS),
+                    "sum": 0.0,
+                    "count": 0
+                })
+
+                for i, value in enumerate(merged["buckets"].values()):
+                    histogram["buckets"][i] += value
+
+                histogram["sum"] += merged["sum"]
+                histogram["count"] += merged["count"]
+
+            for span in document["spans"]:
+                self.spans.append({**span, "labels": {**span["labels"], **labels}})
+
+    def to_prometheus(self, prefix: str = "birdcall"):
+        """
+        Returns the counters and histograms in the Prometheus text exposition format.
+        """
+
+        lines = []
+
+        with self._lock:
+            for name in sorted({name for name, _ in self.counters}):
+                lines.append(f"# TYPE {prefix}_{name} counter")
+
+                for (counter_name, labels), value in self.counters.items():
+                    if counter_name == name:
+                        lines.append(f"{prefix}_{name}{self._format(labels)} {value}")
+
+            for name in sorted({name for name, _ in self.histograms}):
+                lines.append(f"# TYPE {prefix}_{name} histogram")
+
+                for (histogram_name, labels), histogram in self.histograms.items():
+                    if histogram_name != name:
+                        continue
+
+                    for bound, value in zip(BUCKETS, histogram["buckets"]):
+                        le = "+Inf" if bound == math.inf else str(bound)
+
+                        lines.append(f"{prefix}_{name}_bucket{self._format(labels + (('le', le),))} {value}")
+
+                    lines.append(f"{prefix}_{name}_sum{self._format(labels)} {histogram['sum']}")
+                    lines.append(f"{prefix}_{name}_count{self._format(labels)} {histogram['count']}")
+
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _labels(labels):
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    @staticmethod
+    def _format(labels):
+        if not labels:
+            return ""
+
+        return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+def cprofile_hook(directory: str):
+    """
+    Returns a profiler hook that profiles each operation with cProfile, saving its stats to a file named
+    after the operation in the specified directory.
+    """
+
+    import cProfile
+
+    @contextmanager
+    def profile(operation):
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(os.path.join(directory, f"{operation}.prof"))
+
+    return profile
+
+
+def instrumented(method):
+    """
+    Decorates a Birdcall operation so that it is timed as a span, counted, and (if the instance has a profiler
+    hook) profiled.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        profile = self.profiler(method.__name__) if self.profiler else None
+
+        self.metrics.count("operations_total", operation=method.__name__)
+
+        with self.metrics.span(method.__name__):
+            if profile is None:
+                return method(self, *args, **kwargs)
+
+            with profile:
+                return method(self, *args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,37 @@
+MAX_QUERY_LENGTH = 500
+
+
+def shard_query(query: str, clauses: list, max_length: int = MAX_QUERY_LENGTH):
+    """
+    Splits a list of clauses to be OR-ed together (e.g. "from:someone" authorship filters) into as few
+    search queries as possible without any of them exceeding the maximum query length. If a base query is
+    specified, each shard's clauses are grouped in parentheses and appended to it.
+    """
+
+    def build(shard):
+        joined = " OR ".join(shard)
+
+        return f"{query} ({joined})" if query else joined
+
+    if not clauses:
+        return [query]
+
+    queries = []
+    shard = []
+
+    for clause in clauses:
+        #
+        # Start a new shard if adding the clause would make the current one too long.
+        #
+        # NOTE: A clause that is too long to fit even on its own still gets a shard of its own rather than
+        #  being dropped. The search will simply fail for that shard.
+        #
+        if shard and len(build(shard + [clause])) > max_length:
+            queries.append(build(shard))
+            shard = []
+
+        shard.append(clause)
+
+    queries.append(build(shard))
+
+    return queries
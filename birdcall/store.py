@@ -0,0 +1,281 @@
+import array
+import csv
+import glob
+import io
+import os.path
+import threading
+
+FOLLOWER_FIELDS = [
+    "id",
+    "screen_name",
+    "name",
+    "location",
+    "bio",
+    "website",
+    "direct_message_link",
+    "direct_messaged"
+]
+
+
+class FollowerStore:
+    """
+    A compact, append-only store of downloaded followers, kept in a directory.
+
+    Follower ids are kept in a typed array (persisted to "ids.bin") and indexed for constant-time lookups,
+    while their profiles are appended to numbered CSV segment files (without headers) so that adding new
+    followers never rewrites existing data. Changes to existing followers are appended to a journal
+    ("journal.csv"), whose latest entries take precedence over the segments. Once there are too many segments
+    or journal entries, the store is compacted back into a single segment.
+
+    CSV files in the usual format (with a header) can be exported from the store.
+    """
+
+    def __init__(self, path: str, segment_size: int = 50000, max_segments: int = 16, max_journal: int = 10000):
+        self.path = path
+        self.segment_size = segment_size
+        self.max_segments = max_segments
+        self.max_journal = max_journal
+
+        os.makedirs(path, exist_ok=True)
+
+        #
+        # Load the ids and the journal. Profiles in segments are only read when rows are iterated.
+        #
+        self.ids = array.array("q")
+
+        if os.path.exists(self._ids_path):
+            with open(self._ids_path, mode="rb+") as f:
+                data = f.read()
+
+                #
+                # Drop an id that was torn by a crash mid-append, so that later appends stay aligned.
+                #
+                torn = len(data) % self.ids.itemsize
+
+                if torn:
+                    data = data[:-torn]
+                    f.truncate(len(data))
+
+                self.ids.frombytes(data)
+
+        self._index = set(self.ids)
+        self._journal = {}
+        self._lock = threading.Lock()
+
+        if os.path.exists(self._journal_path):
+            self._load_journal()
+
+        #
+        # Determine how many rows the current (i.e. last) segment has room for.
+        #
+        self._segment_rows = 0
+
+        if self._segments():
+            with open(self._segments()[-1], mode="r", newline="") as f:
+                self._segment_rows = sum(1 for _ in csv.reader(f))
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, user_id):
+        return int(user_id) in self._index
+
+    def append(self, rows):
+        """
+        Appends new followers' rows to the store. Rows of followers that are already in the store are
+        ignored.
+        """
+
+        rows = [row for row in rows if int(row["id"]) not in self._index]
+
+        while rows:
+            #
+            # Fill up the current segment, starting a new one if it is full.
+            #
+            segments = self._segments()
+
+            if not segments or self._segment_rows >= self.segment_size:
+                segment = os.path.join(self.path, f"segment-{len(segments) + 1:05d}.csv")
+                self._segment_rows = 0
+            else:
+                segment = segments[-1]
+
+            batch = rows[:self.segment_size - self._segment_rows]
+            rows = rows[len(batch):]
+
+            # NOTE: Profiles are written before ids. If we are interrupted in between, the profiles are simply
+            #  written again by the next download, and compaction drops the duplicates.
+            with open(segment, mode="a", newline="") as f:
+                csv.DictWriter(f, fieldnames=FOLLOWER_FIELDS).writerows(batch)
+
+            ids = array.array("q", [int(row["id"]) for row in batch])
+
+            with open(self._ids_path, mode="ab") as f:
+                ids.tofile(f)
+
+            self.ids.extend(ids)
+            self._index.update(ids)
+            self._segment_rows += len(batch)
+
+    def import_csv(self, path: str):
+        """
+        Imports followers from a CSV file (with a header, e.g. one downloaded without a store), keeping their
+        fields as they are, including whether they have already been messaged. Followers that are already in
+        the store are only updated if the file marks them as messaged (or failed) and the store does not.
+        Returns the number of followers that were imported or updated.
+        """
+
+        with open(path, mode="r", newline="") as f:
+            imported = {
+                int(row["id"]): {field: row.get(field) or "" for field in FOLLOWER_FIELDS}
+                for row in csv.DictReader(f)
+            }
+
+        new_rows = [row for user_id, row in imported.items() if user_id not in self._index]
+        updated_rows = [
+            imported[int(row["id"])]
+            for row in self.rows()
+            if int(row["id"]) in imported
+            and str(row["direct_messaged"]) == "False"
+            and imported[int(row["id"])]["direct_messaged"] not in ("False", "")
+        ]
+
+        self.append(new_rows)
+
+        for row in updated_rows:
+            self.update(row)
+
+        return len(new_rows) + len(updated_rows)
+
+    def update(self, row):
+        """
+        Journals a change to an existing follower's row, without rewriting any segment. Changes can be journaled
+        from multiple threads at once.
+        """
+
+        with self._lock:
+            with open(self._journal_path, mode="a", newline="") as f:
+                csv.DictWriter(f, fieldnames=FOLLOWER_FIELDS).writerow(row)
+
+            self._journal[int(row["id"])] = row
+
+    def rows(self):
+        """
+        Yields the latest row of every follower in the store, in the order that they were added.
+        """
+
+        seen = set()
+
+        for segment in self._segments():
+            with open(segment, mode="r", newline="") as f:
+                for row in csv.DictReader(f, fieldnames=FOLLOWER_FIELDS):
+                    user_id = int(row["id"])
+
+                    if user_id in seen:
+                        continue
+
+                    seen.add(user_id)
+
+                    yield self._journal.get(user_id, row)
+
+    def maybe_compact(self):
+        """
+        Compacts the store if it has accumulated too many segments or journal entries.
+        """
+
+        if len(self._segments()) > self.max_segments or len(self._journal) > self.max_journal:
+            self.compact()
+
+    def compact(self):
+        """
+        Rewrites the store into a single segment with the journal applied and duplicates dropped.
+        """
+
+        segments = self._segments()
+        compacted = os.path.join(self.path, "compacted.tmp")
+        ids = array.array("q")
+
+        with open(compacted, mode="w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=FOLLOWER_FIELDS)
+
+            for row in self.rows():
+                writer.writerow(row)
+                ids.append(int(row["id"]))
+
+        with open(f"{self._ids_path}.tmp", mode="wb") as f:
+            ids.tofile(f)
+
+        #
+        # Swap the compacted segment in over the first one, and only then remove the others.
+        #
+        # NOTE: If we are interrupted before the others are removed, their rows are simply duplicates of rows
+        #  in the compacted segment, which are dropped when rows are read.
+        #
+        os.replace(compacted, os.path.join(self.path, "segment-00001.csv"))
+        os.replace(f"{self._ids_path}.tmp", self._ids_path)
+
+        for segment in segments[1:]:
+            os.remove(segment)
+
+        if os.path.exists(self._journal_path):
+            os.remove(self._journal_path)
+
+        self.ids = ids
+        self._index = set(ids)
+        self._journal = {}
+        self._segment_rows = len(ids)
+
+    def export(self, output: str):
+        """
+        Exports the store to a CSV file (with a header).
+        """
+
+        with open(output, mode="w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=FOLLOWER_FIELDS)
+
+            writer.writeheader()
+            writer.writerows(self.rows())
+
+    def _load_journal(self):
+        """
+        Loads the journal, dropping an entry that was torn by a crash mid-append (i.e. that is incomplete or is
+        not terminated), so that it is neither replayed nor appended onto.
+        """
+
+        with open(self._journal_path, mode="r", newline="") as f:
+            text = f.read()
+            encoding = f.encoding
+
+        consumed = 0
+        complete = 0
+
+        def lines():
+            nonlocal consumed
+
+            for line in io.StringIO(text, newline=""):
+                consumed += len(line)
+
+                yield line
+
+        for values in csv.reader(lines()):
+            if len(values) != len(FOLLOWER_FIELDS) or not text[:consumed].endswith("\n"):
+                break
+
+            row = dict(zip(FOLLOWER_FIELDS, values))
+
+            self._journal[int(row["id"])] = row
+            complete = consumed
+
+        if complete < len(text):
+            os.truncate(self._journal_path, len(text[:complete].encode(encoding)))
+
+    @property
+    def _ids_path(self):
+        return os.path.join(self.path, "ids.bin")
+
+    @property
+    def _journal_path(self):
+        return os.path.join(self.path, "journal.csv")
+
+    def _segments(self):
+        return sorted(glob.glob(os.path.join(self.path, "segment-*.csv")))
@@ -0,0 +1,127 @@
+import json
+import queue
+import time
+
+from .lazy import lazy_import
+
+tweepy = lazy_import("tweepy")
+
+
+class TwitterStream:
+    """
+    A source of tweets pushed by Twitter's filtered stream (rather than polled from search) as they are
+    posted. Tweets are received on a background thread and yielded as they arrive, either until the stream is
+    closed or (optionally) for a limited duration in seconds.
+
+    The stream ends if it is rejected with a client error (e.g. invalid credentials), or if it fails to
+    reconnect after the specified number of retries.
+    """
+
+    def __init__(self, auth, duration: float = None, max_retries: int = 5):
+        self.auth = auth
+        self.duration = duration
+        self.max_retries = max_retries
+
+        self._stream = None
+
+    def filter(self, follow: list):
+        """
+        Yields tweets by, and replies to, the specified user ids.
+        """
+
+        statuses = queue.Queue()
+
+        self._stream = tweepy.Stream(
+            self.auth.consumer_key,
+            self.auth.consumer_secret,
+            self.auth.access_token,
+            self.auth.access_token_secret,
+            max_retries=self.max_retries
+        )
+        self._stream.on_status = statuses.put
+        self._stream.on_request_error = self._on_request_error
+        self._stream.on_disconnect = lambda: statuses.put(None)
+        self._stream.filter(follow=[str(user_id) for user_id in follow], threaded=True)
+
+        deadline = None if self.duration is None else time.time() + self.duration
+
+        try:
+            while deadline is None or time.time() < deadline:
+                try:
+                    status = statuses.get(timeout=None if deadline is None else max(0, deadline - time.time()))
+                except queue.Empty:
+                    return
+
+                # NOTE: None marks that the stream has disconnected.
+                if status is None:
+                    return
+
+                yield status
+        finally:
+            self.close()
+
+    def close(self):
+        """
+        Disconnects from the stream.
+        """
+
+        if self._stream is not None:
+            self._stream.disconnect()
+
+    def _on_request_error(self, status_code):
+        print(f"Stream encountered HTTP error {status_code}.")
+
+        #
+        # Client errors will not go away by reconnecting, except for being rate limited. Other errors are retried
+        # (with backoff) until the retries are exhausted. Either way, the stream then disconnects, which ends it.
+        #
+        if 400 <= status_code < 500 and status_code not in (420, 429):
+            self._stream.disconnect()
+
+
+class ReplayStream:
+    """
+    An offline stand-in for a filtered stream that replays a fixed sequence of tweets (in the JSON format that
+    the stream delivers them in), optionally spaced out by an interval in seconds.
+    """
+
+    def __init__(self, statuses, interval: float = 0):
+        self.statuses = statuses
+        self.interval = interval
+
+        self._closed = False
+
+    @classmethod
+    def from_file(cls, path: str, interval: float = 0):
+        """
+        Creates a replay of a file of tweets, one JSON object per line (e.g. as captured from a stream).
+        """
+
+        with open(path, mode="r") as f:
+            return cls([json.loads(line) for line in f if line.strip()], interval)
+
+    def filter(self, follow: list):
+        """
+        Yields the replayed tweets that are by, or reply to, the specified user ids.
+        """
+
+        follow = set(follow)
+        self._closed = False
+
+        for status in self.statuses:
+            if self._closed:
+                return
+
+            if status["user"]["id"] not in follow and status.get("in_reply_to_user_id") not in follow:
+                continue
+
+            time.sleep(self.interval)
+
+            yield tweepy.models.Status.parse(None, status)
+
+    def close(self):
+        """
+        Stops the replay.
+        """
+
+        self._closed = True
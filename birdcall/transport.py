@@ -0,0 +1,146 @@
+from itertools import takewhile
+import random
+import threading
+import weakref
+
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+#
+# Server errors that are worth retrying (e.g. Twitter being over capacity).
+#
+RETRY_STATUSES = (500, 502, 503, 504)
+
+
+class JitteredRetry(Retry):
+    """
+    A retry policy whose backoff grows exponentially with consecutive errors, with "full jitter" (i.e. a random
+    backoff of up to the exponential one) so that many clients failing at once do not retry in lockstep. Server
+    errors are backed off by their own (typically longer) factor than connection and read errors.
+    """
+
+    def __init__(self, *args, server_backoff_factor: float = 0, max_backoff: float = 120, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self.server_backoff_factor = server_backoff_factor
+        self.max_backoff = max_backoff
+
+    def new(self, **kwargs):
+        return super().new(server_backoff_factor=self.server_backoff_factor, max_backoff=self.max_backoff, **kwargs)
+
+    def get_backoff_time(self):
+        errors = list(takewhile(lambda attempt: attempt.redirect_location is None, reversed(self.history)))
+
+        if not errors:
+            return 0
+
+        factor = self.server_backoff_factor if errors[0].status else self.backoff_factor
+
+        return random.uniform(0, min(factor * 2 ** (len(errors) - 1), self.max_backoff))
+
+
+class Transport(HTTPAdapter):
+    """
+    An HTTP transport for the API client's session, with a sized pool of keep-alive connections, compression,
+    and retries with jittered backoff that depend on the class of error:
+
+      - Connection errors are retried for every request, since the request was never sent.
+      - Read errors and server errors are only retried for idempotent (GET) requests, since a write (e.g. a
+        retweet) might have been applied before it failed.
+      - Rate limit errors are not retried, since the client and rate limit budget handle them.
+
+    The number of requests sent over each connection is tracked, to report how well connections are reused.
+    """
+
+    def __init__(
+            self,
+            pool_size: int = 10,
+            max_retries: int = 3,
+            backoff_factor: float = 0.5,
+            server_backoff_factor: float = 2,
+            max_backoff: float = 30
+    ):
+        super().__init__(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=JitteredRetry(
+                total=max_retries,
+                connect=max_retries,
+                read=max_retries,
+                status=max_retries,
+                redirect=0,
+                allowed_methods=frozenset({"GET", "HEAD"}),
+                status_forcelist=RETRY_STATUSES,
+                backoff_factor=backoff_factor,
+                server_backoff_factor=server_backoff_factor,
+                max_backoff=max_backoff,
+                raise_on_status=False
+            )
+        )
+
+        self.pool_size = pool_size
+
+        self._requests = 0
+        self._connections = 0
+        self._requests_per_socket = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def mount(self, session):
+        """
+        Installs the transport on a session, for all requests to the Twitter API.
+        """
+
+        session.headers["Accept-Encoding"] = "gzip, deflate"
+        session.headers["Connection"] = "keep-alive"
+
+        session.mount("https://", self)
+        session.mount("http://", self)
+
+    def send(self, request, *args, **kwargs):
+        response = super().send(request, *args, **kwargs)
+
+        #
+        # Count the request against the socket that it was sent over. A socket that we have not seen before is a
+        # new connection.
+        #
+        connection = getattr(response.raw, "_connection", None)
+        sock = getattr(connection, "sock", None)
+
+        with self._lock:
+            self._requests += 1
+
+            if sock is not None:
+                if sock not in self._requests_per_socket:
+                    self._connections += 1
+
+                self._requests_per_socket[sock] = self._requests_per_socket.get(sock, 0) + 1
+
+        return response
+
+    def close(self):
+        # NOTE: tweepy closes its session after every request, which would otherwise close every pooled connection
+        #  and defeat keep-alive. Connections are instead only closed by shutdown().
+        pass
+
+    def shutdown(self):
+        """
+        Closes every pooled connection.
+        """
+
+        super().close()
+
+    def stats(self):
+        """
+        Returns statistics about how well connections have been reused: the number of requests sent, the number
+        of connections opened to send them, and the number of requests sent over each open connection.
+        """
+
+        with self._lock:
+            open_connections = list(self._requests_per_socket.values())
+
+            return {
+                "requests": self._requests,
+                "connections": self._connections,
+                "reused_requests": self._requests - self._connections,
+                "requests_per_open_connection": open_connections
+            }
@@ -0,0 +1,28 @@
+import argparse
+
+from birdcall import birdcall
+from birdcall.daemon import Daemon
+
+if __name__ == "__main__":
+    #
+    # Parse arguments.
+    #
+    arg_parser = argparse.ArgumentParser()
+
+    arg_parser.add_argument("--schedule", help="JSON file of the schedule of jobs to run", default="schedule.json")
+    arg_parser.add_argument("--cache-dir",
+                            help="directory to persist caches (e.g. of processed tweets) in across runs (default: "
+                                 "$BIRDCALL_CACHE_DIR, or no persistence)")
+
+    args = arg_parser.parse_args()
+
+    print(f"Arguments = {args}.")
+
+    #
+    # Authenticate once and run the schedule forever.
+    #
+    o = birdcall.Birdcall()
+    o.auth()
+    o.cache_dir = args.cache_dir
+
+    Daemon.from_file(o, args.schedule).run()
@@ -0,0 +1,41 @@
+import argparse
+
+from birdcall import birdcall
+
+if __name__ == "__main__":
+    #
+    # Parse arguments.
+    #
+    arg_parser = argparse.ArgumentParser()
+
+    arg_parser.add_argument("--store", help="directory of the follower store to message followers from")
+    arg_parser.add_argument("--message", help="message to send, formatted with each follower's fields (e.g. {name})")
+    arg_parser.add_argument("--message-file", help="file containing the message to send (instead of --message)")
+    arg_parser.add_argument("--max-messages", type=int, help="maximum number of followers to message")
+    arg_parser.add_argument("--delay", type=float, default=60, help="seconds between messages")
+    arg_parser.add_argument("--import-csv",
+                            help="file of followers in CSV format to import into the store first, keeping whether "
+                                 "they have already been messaged")
+    arg_parser.add_argument("--output", help="file to export the follower store to in CSV format afterwards")
+
+    args = arg_parser.parse_args()
+
+    print(f"Arguments = {args}.")
+
+    if args.message_file:
+        with open(args.message_file, mode="r") as f:
+            args.message = f.read()
+
+    #
+    # Authenticate and run the logic.
+    #
+    o = birdcall.Birdcall()
+    o.auth()
+    o.direct_message_followers(
+        args.store,
+        args.message,
+        max_messages=args.max_messages,
+        delay=args.delay,
+        output=args.output,
+        import_csv=args.import_csv
+    )
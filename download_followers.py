@@ -11,6 +11,12 @@ if __name__ == "__main__":
     arg_parser.add_argument("--user", help="handle of the user to download followers of")
     arg_parser.add_argument("--output", help="file to save followers to in CSV format", default="followers.csv")
     arg_parser.add_argument("--append", action="store_true", help="only append new followers to output file")
+    arg_parser.add_argument("--checkpoint", help="file to save download progress to so that it can be resumed")
+    arg_parser.add_argument("--store", help="directory of a follower store to append followers to (and export from)")
+    arg_parser.add_argument("--strategy", choices=["ids", "list"], default="ids",
+                            help="page through follower ids and look up only new followers, or page through full "
+                                 "followers")
+    arg_parser.add_argument("--workers", type=int, default=4, help="number of follower lookups to run at a time")
 
     args = arg_parser.parse_args()
 
@@ -21,4 +27,12 @@ if __name__ == "__main__":
     #
     o = birdcall.Birdcall()
     o.auth()
-    o.download_followers(args.user, args.output, args.append)
+    o.download_followers(
+        args.user,
+        args.output,
+        args.append,
+        args.checkpoint,
+        args.store,
+        args.strategy,
+        args.workers
+    )
@@ -0,0 +1,35 @@
+import argparse
+import json
+
+from birdcall.fleet import Fleet
+
+if __name__ == "__main__":
+    #
+    # Parse arguments.
+    #
+    arg_parser = argparse.ArgumentParser()
+
+    arg_parser.add_argument("operation", help="operation to run for every account (e.g. retweet_search)")
+    arg_parser.add_argument("--manifest", help="JSON file of the accounts to run as", default="accounts.json")
+    arg_parser.add_argument("--args", help="JSON object of keyword arguments to run the operation with", default="{}")
+    arg_parser.add_argument("--workers", type=int, help="number of accounts to run at a time (default: all)")
+    arg_parser.add_argument("--cache-dir", help="directory to keep each account's caches in")
+    arg_parser.add_argument("--metrics", help="file to write the aggregated metrics to, in Prometheus format")
+
+    args = arg_parser.parse_args()
+
+    print(f"Arguments = {args}.")
+
+    #
+    # Run the operation across every account.
+    #
+    fleet = Fleet.from_file(args.manifest, args.cache_dir)
+    results = fleet.run(args.operation, args.workers, **json.loads(args.args))
+
+    for name, result in results.items():
+        if "error" in result:
+            print(f"{name} failed. (error: {result['error']})")
+
+    if args.metrics:
+        with open(args.metrics, mode="w") as f:
+            f.write(fleet.metrics.to_prometheus())
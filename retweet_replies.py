@@ -1,6 +1,7 @@
 import argparse
 
 from birdcall import birdcall
+from birdcall.stream import TwitterStream
 
 if __name__ == "__main__":
     #
@@ -15,6 +16,13 @@ if __name__ == "__main__":
     arg_parser.add_argument("--delay", default=30, help="seconds retweet retweets")
     arg_parser.add_argument("--traverse-quotes", action="store_true",
                             help="retweets quoted tweets instead of parent tweets when they exist")
+    arg_parser.add_argument("--stream", action="store_true",
+                            help="process replies as they are posted via the filtered stream instead of searching")
+    arg_parser.add_argument("--stream-duration", type=float,
+                            help="seconds to listen to the stream for (default: until max retweets)")
+    arg_parser.add_argument("--cache-dir",
+                            help="directory to persist caches (e.g. of processed tweets) in across runs (default: "
+                                 "$BIRDCALL_CACHE_DIR, or no persistence)")
 
     args = arg_parser.parse_args()
 
@@ -25,11 +33,13 @@ if __name__ == "__main__":
     #
     o = birdcall.Birdcall()
     o.auth()
+    o.cache_dir = args.cache_dir
     o.retweet_replies(
-        args.tweet_id,
-        args.like,
-        args.follow,
-        args.max_retweets,
-        args.delay,
-        args.traverse_quotes
+        tweet_id=args.tweet_id,
+        like=args.like,
+        follow=args.follow,
+        max_retweets=int(args.max_retweets),
+        delay=float(args.delay),
+        traverse_quotes=args.traverse_quotes,
+        stream=TwitterStream(o.api.auth, args.stream_duration) if args.stream else None
     )
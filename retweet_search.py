@@ -13,9 +13,13 @@ if __name__ == "__main__":
     arg_parser.add_argument("--followers", action="store_true", help="explicitly add followers to the query filter")
     arg_parser.add_argument("--members",
                             help="explicitly add members of the list with the specified id to the query filter")
-    arg_parser.add_argument("--filter-count", default=15, help="max number of authorship filters to add to the query")
+    arg_parser.add_argument("--filter-count", type=int, default=15,
+                            help="max number of authorship filters to add to the query (0 for all)")
     arg_parser.add_argument("--like", action="store_true", help="like tweets that get retweeted")
     arg_parser.add_argument("--follow", action="store_true", help="like authors of tweets that get retweeted")
+    arg_parser.add_argument("--cache-dir",
+                            help="directory to persist caches (e.g. of processed tweets) in across runs (default: "
+                                 "$BIRDCALL_CACHE_DIR, or no persistence)")
 
     args = arg_parser.parse_args()
 
@@ -26,6 +30,7 @@ if __name__ == "__main__":
     #
     o = birdcall.Birdcall()
     o.auth()
+    o.cache_dir = args.cache_dir
     o.retweet_search(
         args.query,
         args.friends,
@@ -11,5 +11,6 @@ setup(
     author_email='luke.hollenback+birdcall@gmail.com',
     description='Module for serverless Twitter bots.',
     install_requires=['python-dotenv', 'tweepy'],
+    extras_require={'media': ['Pillow']},
     python_requires='>=3.8'
 )
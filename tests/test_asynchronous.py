@@ -0,0 +1,112 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from birdcall.asynchronous import AsyncBirdcall
+from birdcall.birdcall import Birdcall
+from birdcall.fake import FakeTwitter
+
+
+class SlowTwitter(FakeTwitter):
+    """
+    A fake that responds with some latency, so that concurrent operations interleave as they would over a
+    network.
+    """
+
+    def request(self, *args, **kwargs):
+        time.sleep(0.02)
+
+        return super().request(*args, **kwargs)
+
+
+class AsyncBirdcallTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.directory.name, "content")
+
+        os.makedirs(self.content)
+
+        for i in range(5):
+            path = os.path.join(self.content, f"{i}.txt")
+
+            with open(path, mode="w") as f:
+                f.write(f"post {i}")
+
+            os.utime(path, (i, i))
+
+        self.birdcall = Birdcall()
+        self.birdcall.attach(SlowTwitter.api())
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def gather(self, *calls):
+        async def run():
+            async with AsyncBirdcall(self.birdcall) as birdcall:
+                return await asyncio.gather(*(getattr(birdcall, name)(*args, **kwargs) for name, args, kwargs in calls))
+
+        return asyncio.run(run())
+
+    def test_concurrent_tweets_select_distinct_files(self):
+        self.gather(*[("tweet", (self.content,), {"order": "fifo"})] * 3)
+
+        self.assertEqual([tweet["text"] for tweet in self.birdcall.api.session.posted], ["post 0", "post 1", "post 2"])
+
+    def test_concurrent_tweets_delete_distinct_files(self):
+        self.gather(*[("tweet", (self.content,), {"order": "fifo", "delete_content": True})] * 3)
+
+        self.assertEqual([tweet["text"] for tweet in self.birdcall.api.session.posted], ["post 0", "post 1", "post 2"])
+        self.assertEqual(sorted(os.listdir(self.content)), ["3.txt", "4.txt"])
+
+    def test_concurrent_operations_share_caches(self):
+        self.birdcall.attach(SlowTwitter.api(followers=300, friends=100, tweets=100))
+
+        self.gather(
+            ("retweet_replies", (), {"tweet_id": 1, "delay": 0}),
+            ("retweet_search", ("#birdcall",), {"filter_count": 0}),
+            ("unfollow_traitors", (), {})
+        )
+
+        self.assertEqual(self.birdcall.api.session.calls["mutes/users/ids"], 1)
+
+    def test_concurrent_follows_load_friends_once(self):
+        self.birdcall.attach(SlowTwitter.api(friends=12000, tweets=300))
+
+        self.gather(*[("retweet_replies", (), {"tweet_id": 1, "delay": 0, "follow": True, "burst": 10})] * 3)
+
+        self.assertEqual(self.birdcall.api.session.calls["friends/ids"], 3)
+        self.assertEqual(
+            self.birdcall.api.session.calls["friendships/create"],
+            len(self.birdcall._friend_ids) - 12000
+        )
+
+    def test_slow_fetches_do_not_block_other_operations(self):
+        started = threading.Event()
+        released = threading.Event()
+
+        def fetch():
+            started.set()
+            released.wait(5)
+
+            return {}
+
+        refresh = threading.Thread(target=self.birdcall._load_audience, args=("followers", fetch))
+        refresh.start()
+
+        try:
+            started.wait(5)
+
+            start = time.time()
+            self.gather(("tweet", (self.content,), {"order": "fifo"}))
+
+            self.assertLess(time.time() - start, 2)
+        finally:
+            released.set()
+            refresh.join()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,149 @@
+import os
+import tempfile
+import unittest
+
+import tweepy
+
+from birdcall.birdcall import Birdcall
+from birdcall.content import ContentQueue, tweet_length, validate_text
+from birdcall.fake import FakeTwitter
+
+
+class DuplicateRejectingTwitter(FakeTwitter):
+    """
+    A fake that rejects posts of a particular text as duplicates.
+    """
+
+    duplicate = "post 1"
+
+    def _post(self, params):
+        if params.get("status") == self.duplicate:
+            return self._error(187, "Status is a duplicate.", 403)
+
+        return super()._post(params)
+
+
+class ContentQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.directory.name, "content")
+        self.index = os.path.join(self.directory.name, "index.json")
+
+        os.makedirs(self.content)
+
+        for i, text in enumerate(["post 0", "", "post 2", "x" * 300, "post 4"]):
+            self.write(f"{i}.txt", text, i)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, name, text, mtime):
+        path = os.path.join(self.content, name)
+
+        with open(path, mode="w") as f:
+            f.write(text)
+
+        os.utime(path, (mtime, mtime))
+
+    def drain(self, queue, count):
+        names = []
+
+        for _ in range(count):
+            names.append(os.path.basename(queue.peek()))
+            queue.advance()
+
+        return names
+
+    def test_fifo_skips_invalid_files_and_cycles(self):
+        queue = ContentQueue(self.content, order="fifo")
+
+        self.assertEqual(self.drain(queue, 4), ["0.txt", "2.txt", "4.txt", "0.txt"])
+        self.assertEqual(sorted(queue.invalid), ["1.txt", "3.txt"])
+
+    def test_random_selects_every_file_once_per_cycle(self):
+        queue = ContentQueue(self.content, order="random")
+
+        self.assertEqual(sorted(self.drain(queue, 3)), ["0.txt", "2.txt", "4.txt"])
+
+    def test_without_an_index_files_are_validated_lazily(self):
+        validated = []
+
+        def validate(path):
+            validated.append(os.path.basename(path))
+
+            return validate_text(path)
+
+        queue = ContentQueue(self.content, validate=validate, order="fifo")
+        queue.peek()
+
+        self.assertEqual(validated, ["0.txt"])
+
+    def test_index_is_persisted_across_instances(self):
+        queue = ContentQueue(self.content, self.index, order="fifo")
+        self.drain(queue, 1)
+
+        reopened = ContentQueue(self.content, self.index, order="fifo")
+
+        self.assertEqual(os.path.basename(reopened.peek()), "2.txt")
+
+        self.write("5.txt", "post 5", 5)
+        reopened.advance(delete=True)
+
+        self.assertEqual(self.drain(ContentQueue(self.content, self.index, order="fifo"), 2), ["4.txt", "5.txt"])
+        self.assertFalse(os.path.exists(os.path.join(self.content, "2.txt")))
+
+    def test_rejected_files_are_never_selected_again(self):
+        queue = ContentQueue(self.content, self.index, order="fifo")
+        queue.peek()
+        queue.reject("was rejected")
+
+        reopened = ContentQueue(self.content, self.index, order="fifo")
+
+        self.assertEqual(self.drain(reopened, 3), ["2.txt", "4.txt", "2.txt"])
+        self.assertEqual(reopened.invalid["0.txt"], "was rejected")
+
+    def test_urls_count_as_shortened(self):
+        self.assertEqual(tweet_length("see https://example.com/" + "a" * 300), 27)
+
+
+class TweetTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.directory.name, "content")
+
+        os.makedirs(self.content)
+
+        for i in range(3):
+            path = os.path.join(self.content, f"{i}.txt")
+
+            with open(path, mode="w") as f:
+                f.write(f"post {i}")
+
+            os.utime(path, (i, i))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def birdcall(self, api):
+        birdcall = Birdcall()
+        birdcall.cache_dir = os.path.join(self.directory.name, "cache")
+        birdcall.attach(api)
+
+        return birdcall
+
+    def test_files_rejected_when_posted_are_skipped(self):
+        api = DuplicateRejectingTwitter.api()
+
+        for _ in range(3):
+            self.birdcall(api).tweet(self.content, order="fifo")
+
+        self.assertEqual([tweet["text"] for tweet in api.session.posted], ["post 0", "post 2", "post 0"])
+        self.assertEqual(api.session.calls["statuses/update"], 4)
+
+    def test_single_files_rejected_when_posted_raise(self):
+        with self.assertRaises(tweepy.Forbidden):
+            self.birdcall(DuplicateRejectingTwitter.api()).tweet(os.path.join(self.content, "1.txt"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+
+from birdcall.ledger import FAILED, LIKED, RETWEETED, Ledger
+
+
+class LedgerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "ledger.bin")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_records_are_persisted_and_merged(self):
+        ledger = Ledger(self.path)
+        ledger.record(1, RETWEETED)
+        ledger.record(1, LIKED)
+        ledger.record(1, LIKED)
+        ledger.record(2, FAILED)
+
+        reopened = Ledger(self.path)
+
+        self.assertEqual(len(reopened), 2)
+        self.assertTrue(reopened.has(1, RETWEETED))
+        self.assertTrue(reopened.has(1, LIKED))
+        self.assertFalse(reopened.has(1, FAILED))
+        self.assertTrue(reopened.has(2, RETWEETED | FAILED))
+        self.assertEqual(os.path.getsize(self.path), 3 * 16)
+
+    def test_torn_record_is_dropped(self):
+        Ledger(self.path).record(1, RETWEETED)
+
+        with open(self.path, mode="ab") as f:
+            f.write(b"\x02\x00\x00\x00\x00\x00\x00\x00\x01")
+
+        reopened = Ledger(self.path)
+
+        self.assertEqual(len(reopened), 1)
+        self.assertEqual(os.path.getsize(self.path), 16)
+
+        reopened.record(3, LIKED)
+
+        self.assertTrue(Ledger(self.path).has(3, LIKED))
+
+    def test_without_a_path_is_kept_in_memory(self):
+        ledger = Ledger()
+        ledger.record(1, RETWEETED)
+
+        self.assertTrue(ledger.has(1, RETWEETED))
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import json
+import os
+import tempfile
+import unittest
+
+from birdcall.birdcall import Birdcall
+from birdcall.fake import FakeTwitter
+
+
+class RetweetRepliesTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.api = FakeTwitter.api(tweets=2000)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def run_once(self, **kwargs):
+        birdcall = Birdcall()
+        birdcall.cache_dir = self.directory.name
+        birdcall.attach(self.api)
+
+        searches = self.api.session.calls["search/tweets"]
+        birdcall.retweet_replies(tweet_id=1, delay=0, **kwargs)
+
+        return self.api.session.calls["search/tweets"] - searches
+
+    def marks(self):
+        with open(os.path.join(self.directory.name, "since_ids.json"), mode="r") as f:
+            return json.load(f)
+
+    def test_exhausted_search_advances_the_mark(self):
+        self.run_once(max_retweets=10 ** 6)
+
+        self.assertEqual(list(self.marks()["1"]), ["since_id"])
+        self.assertGreaterEqual(self.marks()["1"]["since_id"], 2000)
+        self.assertEqual(self.run_once(max_retweets=10 ** 6), 1)
+
+    def test_bailed_searches_resume_where_they_left_off(self):
+        exhaustive = FakeTwitter.api(tweets=2000)
+        birdcall = Birdcall()
+        birdcall.attach(exhaustive)
+        birdcall.retweet_replies(tweet_id=1, delay=0, max_retweets=10 ** 6)
+
+        searches = [self.run_once(max_retweets=100)]
+
+        while "max_id" in self.marks()["1"] and len(searches) < 10:
+            searches.append(self.run_once(max_retweets=100))
+
+        # NOTE: Pages overlap by at most one between runs, rather than every run paging from the newest reply.
+        self.assertEqual(list(self.marks()["1"]), ["since_id"])
+        self.assertLessEqual(sum(searches), exhaustive.session.calls["search/tweets"] + len(searches))
+        self.assertEqual(self.api.session.calls["statuses/retweet/:id"], len(self.api.session.retweeted))
+
+    def test_legacy_marks_are_loaded(self):
+        with open(os.path.join(self.directory.name, "since_ids.json"), mode="w") as f:
+            json.dump({"1": 2000}, f)
+
+        self.assertEqual(self.run_once(), 1)
+        self.assertEqual(self.api.session.calls["statuses/retweet/:id"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,20 @@
+import unittest
+
+from birdcall.birdcall import Birdcall
+from birdcall.fake import FakeTwitter
+
+
+class RetweetSearchTest(unittest.TestCase):
+    def setUp(self):
+        self.birdcall = Birdcall()
+        self.birdcall.attach(FakeTwitter.api(friends=100, tweets=300))
+
+    def test_friends_are_loaded_once_for_filters_and_follows(self):
+        self.birdcall.retweet_search("#birdcall", friends=True, filter_count=0, follow=True)
+
+        self.assertEqual(self.birdcall.api.session.calls["statuses/retweet/:id"], 1)
+        self.assertEqual(self.birdcall.api.session.calls["friends/ids"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
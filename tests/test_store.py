@@ -0,0 +1,191 @@
+import os
+import tempfile
+import unittest
+
+from birdcall.birdcall import Birdcall
+from birdcall.fake import FakeTwitter
+from birdcall.store import FOLLOWER_FIELDS, FollowerStore
+
+
+def follower(user_id, **fields):
+    return {**dict.fromkeys(FOLLOWER_FIELDS, ""), "id": str(user_id), "direct_messaged": "False", **fields}
+
+
+class FollowerStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "store")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def ids(self, store):
+        return [int(row["id"]) for row in store.rows()]
+
+    def test_append_skips_known_followers_and_fills_segments(self):
+        store = FollowerStore(self.path, segment_size=2)
+        store.append([follower(1), follower(2), follower(3)])
+        store.append([follower(2), follower(4)])
+
+        self.assertEqual(len(store), 4)
+        self.assertIn(4, store)
+        self.assertEqual(self.ids(store), [1, 2, 3, 4])
+        self.assertEqual(len(store._segments()), 2)
+
+        reopened = FollowerStore(self.path, segment_size=2)
+        reopened.append([follower(5)])
+
+        self.assertEqual(self.ids(reopened), [1, 2, 3, 4, 5])
+        self.assertEqual(len(reopened._segments()), 3)
+
+    def test_journal_is_replayed_over_segments(self):
+        store = FollowerStore(self.path)
+        store.append([follower(1), follower(2)])
+        store.update(follower(2, direct_messaged="True"))
+        store.update(follower(2, direct_messaged="failed"))
+
+        rows = {row["id"]: row["direct_messaged"] for row in FollowerStore(self.path).rows()}
+
+        self.assertEqual(rows, {"1": "False", "2": "failed"})
+
+    def test_compaction_applies_journal_and_drops_duplicates(self):
+        store = FollowerStore(self.path, segment_size=1, max_segments=2)
+        store.append([follower(1), follower(2), follower(3)])
+        store.update(follower(1, direct_messaged="True"))
+
+        # NOTE: Simulates profiles that were written again after an interrupted append.
+        with open(store._segments()[-1], mode="a") as f:
+            f.write("1,,,,,,,False\n")
+
+        store.maybe_compact()
+
+        self.assertEqual(len(store._segments()), 1)
+        self.assertFalse(os.path.exists(store._journal_path))
+
+        reopened = FollowerStore(self.path)
+
+        self.assertEqual(self.ids(reopened), [1, 2, 3])
+        self.assertEqual(next(reopened.rows())["direct_messaged"], "True")
+
+    def test_torn_id_is_dropped(self):
+        store = FollowerStore(self.path)
+        store.append([follower(1), follower(2)])
+
+        with open(store._ids_path, mode="ab") as f:
+            f.write(b"\x03\x00\x00")
+
+        reopened = FollowerStore(self.path)
+
+        self.assertEqual(list(reopened.ids), [1, 2])
+        self.assertEqual(os.path.getsize(reopened._ids_path), 16)
+
+        reopened.append([follower(3)])
+
+        self.assertEqual(list(FollowerStore(self.path).ids), [1, 2, 3])
+
+    def test_torn_journal_entry_is_dropped(self):
+        store = FollowerStore(self.path)
+        store.append([follower(1), follower(2)])
+        store.update(follower(1, bio="line one\nline two", direct_messaged="True"))
+
+        with open(store._journal_path, mode="a") as f:
+            f.write("2,,,,,,,Tr")
+
+        reopened = FollowerStore(self.path)
+
+        self.assertEqual([row["direct_messaged"] for row in reopened.rows()], ["True", "False"])
+        self.assertEqual(next(reopened.rows())["bio"], "line one\nline two")
+
+        reopened.update(follower(2, direct_messaged="failed"))
+
+        self.assertEqual([row["direct_messaged"] for row in FollowerStore(self.path).rows()], ["True", "failed"])
+
+    def test_import_keeps_messaged_marks(self):
+        store = FollowerStore(self.path)
+        store.append([follower(1), follower(2, direct_messaged="True")])
+
+        imported = os.path.join(self.directory.name, "followers.csv")
+
+        with open(imported, mode="w") as f:
+            f.write(",".join(FOLLOWER_FIELDS) + "\n1,,,,,,,True\n2,,,,,,,False\n3,,,,,,,failed\n4,,,,,,,False\n")
+
+        self.assertEqual(store.import_csv(imported), 3)
+
+        rows = {row["id"]: row["direct_messaged"] for row in FollowerStore(self.path).rows()}
+
+        self.assertEqual(rows, {"1": "True", "2": "True", "3": "failed", "4": "False"})
+
+    def test_export_writes_a_csv_with_a_header(self):
+        store = FollowerStore(self.path)
+        store.append([follower(1, screen_name="one")])
+
+        output = os.path.join(self.directory.name, "followers.csv")
+        store.export(output)
+
+        with open(output, mode="r") as f:
+            self.assertEqual(f.read().splitlines(), [",".join(FOLLOWER_FIELDS), "1,one,,,,,,False"])
+
+
+class DownloadFollowersTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+        self.birdcall = Birdcall()
+        self.birdcall.attach(FakeTwitter.api(followers=250))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_requires_an_output_or_a_store(self):
+        with self.assertRaises(ValueError):
+            self.birdcall.download_followers("user2")
+
+    def test_downloads_only_new_followers_into_a_store(self):
+        path = os.path.join(self.directory.name, "store")
+
+        self.birdcall.download_followers("user2", store=path)
+        self.birdcall.download_followers("user2", store=path)
+
+        self.assertEqual(len(FollowerStore(path)), 250)
+        self.assertEqual(self.birdcall.api.session.calls["users/lookup"], 3)
+
+
+class DirectMessageFollowersTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.directory.name, "followers.csv")
+        self.store = os.path.join(self.directory.name, "store")
+
+        self.birdcall = Birdcall()
+        self.birdcall.attach(FakeTwitter.api(followers=20))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def messaged(self):
+        return [user_id for user_id, _ in self.birdcall.api.session.direct_messages]
+
+    def test_campaigns_resume_without_messaging_anyone_twice(self):
+        self.birdcall.download_followers("user2", store=self.store)
+        self.birdcall.direct_message_followers(self.store, "Hi {name}!", max_messages=5, delay=0)
+        self.birdcall.direct_message_followers(self.store, "Hi {name}!", delay=0)
+
+        self.assertEqual(len(self.messaged()), 20)
+        self.assertEqual(len(set(self.messaged())), 20)
+
+    def test_imported_marks_are_kept(self):
+        self.birdcall.download_followers("user2", self.output)
+
+        with open(self.output, mode="r") as f:
+            lines = f.read().splitlines()
+
+        with open(self.output, mode="w") as f:
+            f.write("\n".join(lines[:1] + [line.replace(",False", ",True") for line in lines[1:11]] + lines[11:]))
+
+        self.birdcall.direct_message_followers(self.store, "Hi {name}!", delay=0, import_csv=self.output)
+
+        self.assertEqual(len(self.messaged()), 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
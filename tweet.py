@@ -8,14 +8,22 @@ if __name__ == "__main__":
     #
     arg_parser = argparse.ArgumentParser()
 
-    arg_parser.add_argument("--path", help="file or directory (random will be chosen) of file to tweet")
-    arg_parser.add_argument("--media", help="file or directory (random will be chosen) of media to attach to tweet")
+    arg_parser.add_argument("--path", help="file or directory (next queued will be chosen) of file to tweet")
+    arg_parser.add_argument("--media",
+                            help="file or directory (next queued will be chosen) of media to attach to tweet")
     arg_parser.add_argument(
         "--delete-content",
         action="store_true",
         help="delete the tweet's content file after posting"
     )
     arg_parser.add_argument("--delete-media", action="store_true", help="delete the tweet's media file after posting")
+    arg_parser.add_argument("--order", choices=["random", "fifo"], default="random",
+                            help="order to tweet files from directories in")
+    arg_parser.add_argument("--preupload", type=int, default=0,
+                            help="number of queued media files to upload ahead of time in the background")
+    arg_parser.add_argument("--cache-dir",
+                            help="directory to persist caches (e.g. of processed tweets) in across runs (default: "
+                                 "$BIRDCALL_CACHE_DIR, or no persistence)")
 
     args = arg_parser.parse_args()
 
@@ -24,4 +32,5 @@ if __name__ == "__main__":
     #
     o = birdcall.Birdcall()
     o.auth()
-    o.tweet(args.path, args.media, args.delete_content, args.delete_media)
+    o.cache_dir = args.cache_dir
+    o.tweet(args.path, args.media, args.delete_content, args.delete_media, args.order, args.preupload)
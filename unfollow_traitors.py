@@ -3,9 +3,24 @@ import argparse
 from birdcall import birdcall
 
 if __name__ == "__main__":
+    #
+    # Parse arguments.
+    #
+    arg_parser = argparse.ArgumentParser()
+
+    arg_parser.add_argument("--workers", type=int, default=4, help="number of unfollows to perform concurrently")
+    arg_parser.add_argument("--cache-dir",
+                            help="directory to persist caches (e.g. of processed tweets) in across runs (default: "
+                                 "$BIRDCALL_CACHE_DIR, or no persistence)")
+
+    args = arg_parser.parse_args()
+
+    print(f"Arguments = {args}.")
+
     #
     # Authenticate and run the logic.
     #
     o = birdcall.Birdcall()
     o.auth()
-    o.unfollow_traitors()
+    o.cache_dir = args.cache_dir
+    o.unfollow_traitors(args.workers)